@@ -2,11 +2,78 @@
 Script that transforms 'svn status -uv' output into readable table form
 """
 import sys
+import os
+import io
+import stat
+import zlib
+import gzip
+import bz2
+import lzma
+import array
+import re
+import html
+import glob
+import json
+import codecs
+import time
+import socket
+import threading
+import queue
+import socketserver
+import bisect
+import sqlite3
+import datetime
+import struct
 import argparse
+import itertools
+import heapq
+import importlib
+import inspect
+import importlib.util
+import collections
+import string
+import math
+import random
+import functools
+import concurrent.futures
+
+numpy = None  # imported on first use, see 'import_numpy'
 
 
 class ParseException(Exception):
-    pass
+    line = None  # line that can't be parsed. Set by 'parse'
+    line_number = None  # 1-based number of line that can't be parsed. Set by 'parse'
+
+
+NOT_CONTROLLED_BYTES = (b'?', b'I')  # values of 'Status' column of items that are not under version control
+
+
+def is_controlled_bytes(line_to_parse):
+    """
+    Same as StatusColumn.is_controlled, but line is raw bytes. Empty line is treated as controlled
+    """
+    return line_to_parse[:1] not in NOT_CONTROLLED_BYTES
+
+
+def has_revisions(line_to_parse):
+    """
+    :return: False for out of date item added on the server. It has no revisions and author, only path follows
+    'OutOfDate' column, e.g. '        *                                  trunk/new.c'
+    """
+    if line_to_parse[8:9] != '*':
+        return True
+    tail = line_to_parse[10:].split(None, 1)
+    return not tail or tail[0].isdigit() or tail[0] in ('-', '?')
+
+
+def has_revisions_bytes(line_to_parse):
+    """
+    Same as 'has_revisions', but line is raw bytes
+    """
+    if line_to_parse[8:9] != b'*':
+        return True
+    tail = line_to_parse[10:].split(None, 1)
+    return not tail or tail[0].isdigit() or tail[0] in (b'-', b'?')
 
 
 class Column:
@@ -16,7 +83,9 @@ class Column:
     alignment = '^'
     width = 0
     title = 'Unnamed'
+    name = 'unnamed'  # identifier used to select column, e.g. in --columns
     _transformation_map = {}
+    _flag_position = None  # position of the symbol in line for single-character columns
 
     def __init__(self, width=0, title='Unnamed', alignment='^'):
         """
@@ -48,8 +117,15 @@ class Column:
         """
         Crops value to column width. Applies alignment.
         """
-        pattern = '{{:{a}{w}.{w}s}}'.format(a=self.__alignment, w=self.width)
-        return pattern.format(value)
+        return self.build_pattern().format(value)
+
+    def build_pattern(self, width=None):
+        """
+        :param width: Width to use instead of column width
+        :return: Format string that crops value to width and applies alignment
+        """
+        width = self.width if width is None else width
+        return '{{:{a}{w}.{w}s}}'.format(a=self.__alignment, w=width)
 
     def _transform_value(self, value):
         """
@@ -66,11 +142,36 @@ class Column:
         """
         pass
 
+    def build_bytes_value(self, line_to_parse, encoding='utf-8'):
+        """
+        Same as 'build_value', but line is raw bytes. Values of single-character columns are looked up
+        by byte value. Only free text is decoded using 'encoding' with 'surrogateescape' error handler.
+        Can raise a ParseException if value can't be retrieved
+        """
+        position = self._flag_position
+        if position is None:
+            return self.build_value(line_to_parse.decode(encoding, 'surrogateescape'))
+        if position > 0 and not is_controlled_bytes(line_to_parse):
+            return ''
+        if len(line_to_parse) <= position:
+            raise ParseException("Can not parse column '{col}'. Line is too short".format(col=self.title))
+        return self._bytes_transformation_table()[line_to_parse[position]]
+
+    def _bytes_transformation_table(self):
+        """
+        :return: List of 256 transformed values indexed by byte value. Built once per class
+        """
+        cls = type(self)
+        if '_bytes_table' not in cls.__dict__:
+            cls._bytes_table = [self._transform_value(chr(b)) for b in range(256)]
+        return cls._bytes_table
+
 
 class StatusColumn(Column):
     """
     This column indicates that an item was added, deleted, or otherwise changed
     """
+    name = 'status'
     _transformation_map = {
         ' ': ' ',  # No modifications.
 
@@ -99,6 +200,7 @@ class StatusColumn(Column):
         '~': 'Kind replaced'  # Item is versioned as one kind of object (file, directory, link),
         #  but has been replaced by a different kind of object.
     }
+    _flag_position = 0
 
     def __init__(self, width=0, title='Status', alignment='^'):
         super().__init__(width=width, title=title, alignment=alignment)
@@ -122,6 +224,7 @@ class PropertiesColumn(Column):
     """
     This column tells the status of a file's or directory's properties
     """
+    name = 'props'
     _transformation_map = {
         ' ': ' ',  # No modifications.
 
@@ -129,6 +232,7 @@ class PropertiesColumn(Column):
 
         'C': 'Conflict'  # Properties for this item are in conflict with property updates received from the repository.
     }
+    _flag_position = 1
 
     def __init__(self, width=0, title='Props', alignment='^'):
         super().__init__(width=width, title=title, alignment=alignment)
@@ -150,11 +254,13 @@ class IsLockedColumn(Column):
     """
     This column is populated only if the working copy directory is locked
     """
+    name = 'locked'
     _transformation_map = {
         ' ': ' ',  # Item is not locked.
 
         'L': 'Locked'  # Item is locked.
     }
+    _flag_position = 2
 
     def __init__(self, width=0, title='isLocked', alignment='^'):
         super().__init__(width=width, title=title, alignment=alignment)
@@ -176,11 +282,13 @@ class AddWithHistColumn(Column):
     """
     This column is populated only if the item is scheduled for addition-with-history
     """
+    name = 'history'
     _transformation_map = {
         ' ': ' ',  # No history scheduled with commit.
 
         '+': '+'  # History scheduled with commit.
     }
+    _flag_position = 3
 
     def __init__(self, width=0, title='AddWithHist', alignment='^'):
         super().__init__(width=width, title=title, alignment=alignment)
@@ -202,11 +310,13 @@ class SwitchedToParentColumn(Column):
     """
     This column is populated only if the item is switched relative to its parent
     """
+    name = 'switched'
     _transformation_map = {
         ' ': ' ',  # Item is a child of its parent directory.
 
         'S': 'Switched'  # Item is switched.
     }
+    _flag_position = 4
 
     def __init__(self, width=0, title='SwitchedToParent', alignment='^'):
         super().__init__(width=width, title=title, alignment=alignment)
@@ -228,6 +338,7 @@ class LockInfoColumn(Column):
     """
     This column is populated with lock information
     """
+    name = 'lock_info'
     _transformation_map = {
         ' ': ' ',  # When --show-updates (-u) is used, the file is not locked.
         #  If --show-updates (-u) is not used, this merely means
@@ -245,6 +356,7 @@ class LockInfoColumn(Column):
         'B': 'Broken'  # File was locked in this working copy, but the lock has been “broken” and is invalid.
         #  The file is no longer locked. This appears only when --show-updates (-u) is used.
     }
+    _flag_position = 5
 
     def __init__(self, width=0, title='LockInfo', alignment='^'):
         super().__init__(width=width, title=title, alignment=alignment)
@@ -266,11 +378,13 @@ class ConflictColumn(Column):
     """
     This column is populated only if the item is the victim of a tree conflict
     """
+    name = 'conflict'
     _transformation_map = {
         ' ': ' ',  # Item is not the victim of a tree conflict.
 
         'C': 'Conflict'  # Item is the victim of a tree conflict.
     }
+    _flag_position = 6
 
     def __init__(self, width=0, title='Conflict', alignment='^'):
         super().__init__(width=width, title=title, alignment=alignment)
@@ -301,11 +415,13 @@ class OutOfDateColumn(Column):
     """
     This column shows whether a newer revision of the item exists on the server
     """
+    name = 'out_of_date'
     _transformation_map = {
         ' ': ' ',  # The item in your working copy is up to date.
 
         '*': 'Out of date'  # A newer revision of the item exists on the server.
     }
+    _flag_position = 8
 
     def __init__(self, width=0, title='Out of date', alignment='^'):
         super().__init__(width=width, title=title, alignment=alignment)
@@ -327,6 +443,7 @@ class WorkingRevisionColumn(Column):
     """
     This column shows a working revision
     """
+    name = 'working_revision'
 
     def __init__(self, width=0, title='Working revision', alignment='^'):
         super().__init__(width=width, title=title, alignment=alignment)
@@ -335,21 +452,31 @@ class WorkingRevisionColumn(Column):
         # 1 case) if item is not under version control system
         #               then column is empty
         controlled = StatusColumn().is_controlled(line_to_parse)
-        if not controlled:
+        if not controlled or not has_revisions(line_to_parse):
             return ''
         # 2 case) 'Working revision' column is the 1st word after 'OutOfDate' column
         tail = line_to_parse[10:].split()
-        if len(tail) < 0:
+        if len(tail) < 1:
             raise ParseException(
                 "Can not parse column '{col}'.".format(col=self.title))
         value = tail[0]
         return value
 
+    def build_bytes_value(self, line_to_parse, encoding='utf-8'):
+        if not is_controlled_bytes(line_to_parse) or not has_revisions_bytes(line_to_parse):
+            return ''
+        tail = line_to_parse[10:].split(None, 1)
+        if len(tail) < 1:
+            raise ParseException(
+                "Can not parse column '{col}'.".format(col=self.title))
+        return tail[0].decode('ascii', 'surrogateescape')
+
 
 class CommittedRevisionColumn(Column):
     """
         This column shows the last committed revision
     """
+    name = 'committed_revision'
 
     def __init__(self, width=0, title='Committed revision', alignment='^'):
         super().__init__(width=width, title=title, alignment=alignment)
@@ -358,7 +485,7 @@ class CommittedRevisionColumn(Column):
         # 1 case) if item is not under version control system
         #               then column is empty
         controlled = StatusColumn().is_controlled(line_to_parse)
-        if not controlled:
+        if not controlled or not has_revisions(line_to_parse):
             return ''
         # 2 case) 'Committed revision' column is the 2nd word after 'OutOfDate' column
         tail = line_to_parse[10:].split()
@@ -368,11 +495,21 @@ class CommittedRevisionColumn(Column):
         value = tail[1]
         return value
 
+    def build_bytes_value(self, line_to_parse, encoding='utf-8'):
+        if not is_controlled_bytes(line_to_parse) or not has_revisions_bytes(line_to_parse):
+            return ''
+        tail = line_to_parse[10:].split(None, 2)
+        if len(tail) < 2:
+            raise ParseException(
+                "Can not parse column '{col}'.".format(col=self.title))
+        return tail[1].decode('ascii', 'surrogateescape')
+
 
 class CommittedAuthorColumn(Column):
     """
     This column shows the last committed author
     """
+    name = 'author'
 
     def __init__(self, width=0, title='Committed author', alignment='^'):
         super().__init__(width=width, title=title, alignment=alignment)
@@ -381,7 +518,7 @@ class CommittedAuthorColumn(Column):
         # 1 case) if item is not under version control system
         #               then column is empty
         controlled = StatusColumn().is_controlled(line_to_parse)
-        if not controlled:
+        if not controlled or not has_revisions(line_to_parse):
             return ''
         # 2 case) 'Committed revision' column is the 3rd word after 'OutOfDate' column
         tail = line_to_parse[10:].split()
@@ -391,11 +528,21 @@ class CommittedAuthorColumn(Column):
         value = tail[2]
         return value
 
+    def build_bytes_value(self, line_to_parse, encoding='utf-8'):
+        if not is_controlled_bytes(line_to_parse) or not has_revisions_bytes(line_to_parse):
+            return ''
+        tail = line_to_parse[10:].split(None, 3)
+        if len(tail) < 3:
+            raise ParseException(
+                "Can not parse column '{col}'.".format(col=self.title))
+        return tail[2].decode(encoding, 'surrogateescape')
+
 
 class WorkingCopyPathColumn(Column):
     """
     This column shows a working copy path
     """
+    name = 'path'
 
     def __init__(self, width=50, title='Working copy path', alignment='<'):
         super().__init__(width=width, title=title, alignment=alignment)
@@ -406,15 +553,33 @@ class WorkingCopyPathColumn(Column):
         controlled = StatusColumn().is_controlled(line_to_parse)
         if not controlled:
             return line_to_parse[1:].strip()
-        # 2 case) if --verbose flag was passed
-        #               then 'path' column is right after the 'last committed author' column
-        author = CommittedAuthorColumn().build_value(line_to_parse)
-        start_of_last_column = line_to_parse.find(author) + len(author)
-        value = line_to_parse[start_of_last_column:].strip()
-        if value == '':
+        # 2 case) if item is added on the server
+        #               then 'path' column is the rest of line after 'OutOfDate' column
+        if not has_revisions(line_to_parse):
+            return line_to_parse[10:].strip()
+        # 3 case) if --verbose flag was passed
+        #               then 'path' column is the rest of line after 3 words that follow 'OutOfDate' column:
+        #               working revision, last committed revision and last committed author
+        tail = line_to_parse[10:].split(None, 3)
+        if len(tail) < 4 or tail[3].strip() == '':
             raise ParseException("Can not parse column '{col}'.".format(col=self.title))
+        value = tail[3].strip()
         return value
 
+    def build_bytes_value(self, line_to_parse, encoding='utf-8'):
+        # 1 case) if item is not under version control system
+        #               then 'path' column is right after the 'status' column
+        if not is_controlled_bytes(line_to_parse):
+            return line_to_parse[1:].strip().decode(encoding, 'surrogateescape')
+        # 2 case) item added on the server has only 'path' after 'OutOfDate' column
+        if not has_revisions_bytes(line_to_parse):
+            return line_to_parse[10:].strip().decode(encoding, 'surrogateescape')
+        # 3 case) 'path' is the rest of line after 3 words that follow 'OutOfDate' column
+        tail = line_to_parse[10:].split(None, 3)
+        if len(tail) < 4 or tail[3].strip() == b'':
+            raise ParseException("Can not parse column '{col}'.".format(col=self.title))
+        return tail[3].strip().decode(encoding, 'surrogateescape')
+
 
 class Table:
     """
@@ -473,12 +638,27 @@ class Table:
         Parse line, transforms values and wraps them to width if necessary.
         :return: String representing a row
         """
-        if ConflictColumn().is_conflict_description(line_to_parse):
-            row = line_to_parse[:-1]
-        else:
-            row = self.__parse_transform_line(line_to_parse)
-            row = self.__wrap_row(row)
-            row = self.__join_row(row)
+        record = parse_line(line_to_parse, self.columns)
+        return self.format_record(record)
+
+    def format_record(self, record):
+        """
+        Wraps values of parsed line to width. Conflict descriptions are returned as is.
+        :param record: Element of class 'Record' parsed with the columns of this table
+        :return: String representing a row
+        """
+        if record.values is None:
+            return record.line[:-1]
+        return self.format_row(record.values)
+
+    def format_row(self, values):
+        """
+        Wraps already transformed values to width.
+        :param values: List of strings. One value per column
+        :return: String representing a row
+        """
+        row = self.__wrap_row(list(values))
+        row = self.__join_row(row)
         return row
 
     def build_row_separator(self):
@@ -516,17 +696,6 @@ class Table:
         res = '\n'.join(res)
         return res
 
-    def __parse_transform_line(self, line_to_parse):
-        """
-        Parse line into list of columns' values. Transforms it into a readable form.
-        :return: List which elements can be treated as values of corresponding column
-        """
-        row = []
-        for col in self.columns:
-            value = col.build_value(line_to_parse)
-            row.append(value)
-        return row
-
     def __wrap_row(self, row):
         """
         Wraps row values to width.
@@ -563,6 +732,136 @@ class Table:
                 return False
         return True
 
+    def compile(self):
+        """
+        :return: TableSpec with the columns, widths and separators of this table
+        """
+        return TableSpec(self.columns, column_separator=self.column_separator,
+                         left_separator=self.left_separator, right_separator=self.right_separator,
+                         header_separator=self.header_separator, row_separator=self.row_separator)
+
+
+class TableSpec:
+    """
+    Immutable compiled table. Can be used wherever Table is used, e.g. in 'render' or RowWriter.
+    Widths and cell patterns are compiled once, so one spec can be shared by threads rendering concurrently.
+    Columns are used only for parsing and titles; changing their widths later doesn't affect the spec.
+    """
+    __slots__ = ('columns', 'cols_count', 'widths', 'table_width', 'column_separator', 'left_separator',
+                 'right_separator', 'header_separator', 'row_separator', '_cells', '_header',
+                 '_header_separator', '_row_separator')
+
+    def __init__(self, columns, widths=None, column_separator=' | ', left_separator=' ',
+                 right_separator=' ', header_separator='=', row_separator='-', _cells=None):
+        """
+        :param columns: Iterable of elements of 'Column' class
+        :param widths: Width of every column. Default is the current widths of columns
+        :param _cells: Compiled cells to reuse, see 'derive'
+        Other parameters are the same as in 'Table'
+        """
+        columns = tuple(columns)
+        widths = tuple(col.width for col in columns) if widths is None else tuple(widths)
+        if len(widths) != len(columns):
+            raise ValueError('expected {} widths, got {}'.format(len(columns), len(widths)))
+        if _cells is None:
+            _cells = tuple(self.__compile_cell(col, width) for col, width in zip(columns, widths))
+        for col in columns:
+            if col._flag_position is not None:
+                col._bytes_transformation_table()  # built in advance, not lazily by concurrent threads
+        table_width = (len(left_separator) + len(right_separator) + sum(widths) +
+                       max(len(columns) - 1, 0) * len(column_separator))
+        set_slot = object.__setattr__
+        set_slot(self, 'columns', columns)
+        set_slot(self, 'cols_count', len(columns))
+        set_slot(self, 'widths', widths)
+        set_slot(self, 'table_width', table_width)
+        set_slot(self, 'column_separator', column_separator)
+        set_slot(self, 'left_separator', left_separator)
+        set_slot(self, 'right_separator', right_separator)
+        set_slot(self, 'header_separator', header_separator)
+        set_slot(self, 'row_separator', row_separator)
+        set_slot(self, '_cells', _cells)
+        set_slot(self, '_header', self.format_row([col.title for col in columns]))
+        set_slot(self, '_header_separator', header_separator * table_width)
+        set_slot(self, '_row_separator', row_separator * table_width)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('TableSpec is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('TableSpec is immutable')
+
+    def __reduce__(self):
+        return (TableSpec, (self.columns, self.widths, self.column_separator, self.left_separator,
+                            self.right_separator, self.header_separator, self.row_separator))
+
+    def derive(self, widths=(), **separators):
+        """
+        Creates spec with some widths or separators overridden.
+        Columns and compiled cells of columns whose width is not changed are shared with this spec.
+        :param widths: Iterable of pairs (column position in this spec, width). Positions out of range are ignored
+        :param separators: Separators to override, e.g. column_separator=' '
+        :return: TableSpec
+        """
+        new_widths = list(self.widths)
+        cells = list(self._cells)
+        for i, width in widths:
+            if 0 <= i < self.cols_count and new_widths[i] != width:
+                new_widths[i] = width
+                cells[i] = self.__compile_cell(self.columns[i], width)
+        options = {name: getattr(self, name) for name in ('column_separator', 'left_separator', 'right_separator',
+                                                          'header_separator', 'row_separator')}
+        for name, value in separators.items():
+            if name not in options:
+                raise TypeError("unknown separator: '{}'".format(name))
+            options[name] = value
+        return TableSpec(self.columns, new_widths, _cells=tuple(cells), **options)
+
+    def build_header(self):
+        return self._header
+
+    def build_row(self, line_to_parse):
+        return self.format_record(parse_line(line_to_parse, self.columns))
+
+    def format_record(self, record):
+        """
+        See Table.format_record
+        """
+        if record.values is None:
+            return record.line[:-1]
+        return self.format_row(record.values)
+
+    def format_row(self, values):
+        """
+        See Table.format_row. Values that fit to width are formatted without wrapping.
+        """
+        cells = self._cells
+        if any(values) and all(len(value) <= cell[0] for value, cell in zip(values, cells)):
+            return self.left_separator + self.column_separator.join(
+                [cell[1](value) for value, cell in zip(values, cells)]) + self.right_separator
+        rest = list(values)
+        lines = []
+        while any(rest):
+            line = []
+            for i, (width, fit) in enumerate(cells):
+                line.append(fit(rest[i][:width]))
+                rest[i] = rest[i][width:]
+            lines.append(self.left_separator + self.column_separator.join(line) + self.right_separator)
+        return '\n'.join(lines)
+
+    def build_row_separator(self):
+        return self._row_separator
+
+    def build_header_separator(self):
+        return self._header_separator
+
+    @staticmethod
+    def __compile_cell(col, width):
+        """
+        :return: Pair (width, function that crops value to width and applies alignment)
+        """
+        return width, col.build_pattern(width).format
+
 
 class RowWriter:
     """
@@ -575,6 +874,33 @@ class RowWriter:
         """
         pass
 
+    def write_header(self, table):
+        """
+        Writes the header of table followed by the header separator
+        """
+        self.write(table.build_header())
+        self.write(table.build_header_separator())
+
+    def write_record(self, table, record):
+        """
+        Writes the parsed line as table row followed by the row separator
+        :param record: Element of class 'Record' parsed with the columns of table
+        """
+        self.write(table.format_record(record))
+        self.write(table.build_row_separator())
+
+    def flush(self):
+        """
+        Waits until all rows passed so far are written
+        """
+        pass
+
+    def close(self):
+        """
+        Finishes writing. Output itself is not closed
+        """
+        pass
+
 
 class ConsoleRowWriter(RowWriter):
     """
@@ -593,7 +919,7 @@ class FileRowWriter(RowWriter):
 
     def __init__(self, file):
         """
-        :param file: Output file
+        :param file: Output file. Any text stream, e.g. io.StringIO, can be used
         """
         self.__file = file
 
@@ -601,85 +927,2991 @@ class FileRowWriter(RowWriter):
         self.__file.write(row + '\n')
 
 
-class SVNStatusTransformApp:
+class HtmlRowWriter(RowWriter):
     """
-    Main class
+    Class for writing table rows to HTML pages of fixed size.
+    Pages 'page-00001.html', 'page-00002.html', ... are written to directory together with 'index.html'
+    and 'style.css'. Values of columns with transformation map get CSS class '<column>-<value>',
+    e.g. 'status-modified'.
     """
-    args = None
+    PAGE_SIZE = 10000
+    STYLE = {
+        'conflict': 'background-color: #f4a6a6',
+        'conflicts': 'background-color: #f4a6a6',
+        'modified': 'background-color: #f6e7a1',
+        'out-of-date': 'background-color: #b9d7f4',
+        'missed': 'background-color: #f6c48f',
+        'not-controlled': 'color: #808080'
+    }
 
-    def __init__(self):
-        parser = self.__create_parser()
-        self.args = parser.parse_args(sys.argv[1:])
+    def __init__(self, directory, page_size=PAGE_SIZE, title='svn status'):
+        """
+        :param directory: Output directory. Created if it doesn't exist
+        :param page_size: Number of rows per page
+        """
+        self.directory = directory
+        self.page_size = page_size
+        self.title = title
+        self.__page = None
+        self.__page_rows = 0
+        self.__pages = []  # list of (file name, number of rows)
+        self.__header = ''
+        self.__cells = []  # per column: dict value -> precomputed '<td>' markup
+        self.__colspan = 1
+        os.makedirs(directory, exist_ok=True)
 
-    def run(self):
-        text_to_parse = self.args.input_file.readlines()
-        row_writer = ConsoleRowWriter() if self.args.output is None \
-            else FileRowWriter(self.args.output)
-        table = self.__create_table()
-        self.__print_table(table, text_to_parse, row_writer)
+    def write(self, row):
+        self.__write_row('<tr><td class="text" colspan="{}"><pre>{}</pre></td></tr>\n'.format(
+            self.__colspan, html.escape(row)))
+
+    def write_header(self, table):
+        self.__colspan = table.cols_count
+        self.__header = '<tr>{}</tr>\n'.format(''.join('<th>{}</th>'.format(html.escape(col.title))
+                                                      for col in table.columns))
+        self.__cells = []
+        rules = []
+        for col in table.columns:
+            cells = {'': '<td></td>', ' ': '<td> </td>'}
+            column_class = self.css_name(col.title)
+            for value in col._transformation_map.values():
+                value_class = self.css_name(value)
+                if value_class:
+                    css_class = '{}-{}'.format(column_class, value_class)
+                    cells[value] = '<td class="{}">{}</td>'.format(css_class, html.escape(value))
+                    if value_class in self.STYLE:
+                        rules.append('.{} {{ {} }}\n'.format(css_class, self.STYLE[value_class]))
+            self.__cells.append(cells)
+        with open(os.path.join(self.directory, 'style.css'), 'w', encoding='utf-8') as style:
+            style.write('table { border-collapse: collapse; font-family: monospace }\n')
+            style.write('td, th { border: 1px solid #c0c0c0; padding: 0 4px; white-space: nowrap }\n')
+            style.writelines(rules)
+
+    def write_record(self, table, record):
+        if record.values is None:
+            self.write(record.line.rstrip('\n'))
+            return
+        cells = self.__cells
+        row = ['<tr>']
+        for i, value in enumerate(record.values):
+            cell = cells[i].get(value)
+            row.append(cell if cell is not None else '<td>{}</td>'.format(html.escape(value)))
+        row.append('</tr>\n')
+        self.__write_row(''.join(row))
+
+    def close(self):
+        self.__close_page()
+        with open(os.path.join(self.directory, 'index.html'), 'w', encoding='utf-8') as index:
+            index.write(self.__document_start(self.title))
+            index.write('<ul>\n')
+            first = 1
+            for name, rows in self.__pages:
+                index.write('<li><a href="{0}">{0}</a>: rows {1}-{2}</li>\n'.format(name, first, first + rows - 1))
+                first += rows
+            index.write('</ul>\n</body>\n</html>\n')
 
-    def __create_parser(self):
-        argument_parser = argparse.ArgumentParser(description='''Script that transforms 'svn status -uv' 
-                                                                  output into readable table form''')
-        argument_parser.add_argument('input_file', type=argparse.FileType(),
-                                     help="File with output of 'svn status -uv' command ")
-        argument_parser.add_argument('-o', '--output', type=argparse.FileType(mode='w'),
-                                     help='File to write script output')
-        argument_parser.add_argument('-w', '--width', type=int, nargs=2, action='append',
-                                     metavar=('INDEX', 'WIDTH'), default=[],
-                                     help='Set column width. Column index is 0-based')
+    @staticmethod
+    def css_name(text):
+        """
+        :return: Lowercase text with runs of non-alphanumeric characters replaced by '-', e.g. 'Out of date' -> 'out-of-date'
+        """
+        return re.sub('[^0-9a-z]+', '-', text.lower()).strip('-')
+
+    def __write_row(self, markup):
+        if self.__page is None:
+            self.__open_page()
+        self.__page.write(markup)
+        self.__page_rows += 1
+        if self.__page_rows >= self.page_size:
+            self.__close_page()
+
+    def __open_page(self):
+        name = 'page-{:05d}.html'.format(len(self.__pages) + 1)
+        self.__page = open(os.path.join(self.directory, name), 'w', encoding='utf-8', errors='backslashreplace')
+        self.__page.write(self.__document_start('{} - {}'.format(self.title, name)))
+        self.__page.write('<p><a href="index.html">index</a></p>\n<table>\n')
+        self.__page.write(self.__header)
+        self.__pages.append((name, 0))
+        self.__page_rows = 0
+
+    def __close_page(self):
+        if self.__page is None:
+            return
+        self.__page.write('</table>\n</body>\n</html>\n')
+        self.__page.close()
+        self.__page = None
+        self.__pages[-1] = (self.__pages[-1][0], self.__page_rows)
 
-        return argument_parser
+    @staticmethod
+    def __document_start(title):
+        return ('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>{}</title>\n'
+                '<link rel="stylesheet" href="style.css">\n</head>\n<body>\n').format(html.escape(title))
 
-    def __create_table(self):
-        columns = [
-            StatusColumn(),
-            PropertiesColumn(),
-            IsLockedColumn(),
-            AddWithHistColumn(),
-            SwitchedToParentColumn(),
-            LockInfoColumn(),
-            ConflictColumn(),
-            OutOfDateColumn(),
-            WorkingRevisionColumn(),
-            CommittedRevisionColumn(),
-            CommittedAuthorColumn(),
-            WorkingCopyPathColumn()
-        ]
-        col_cnt = len(columns)
-        for [i, w] in self.args.width:
-            if 0 <= i < col_cnt:
-                columns[i].width = w
-        table = Table(columns, left_separator='| ', right_separator=' |')
-        return table
 
-    def __print_table(self, table, lines_to_parse, row_writer):
+class JsonRowWriter(RowWriter):
+    """
+    Class for writing table rows to file as JSON lines. Keys are column titles and 'Changelist' for items
+    in changelist. Conflict descriptions are written as {"description": line}
+    """
+    __file = None
+
+    def __init__(self, file):
         """
-        Parse lines and prints them using specified row_writer
-        :param lines_to_parse: 'svn status -uv' output
-        :param row_writer: Element of class 'RowWriter'
+        :param file: Output file
         """
-        header_sep = table.build_header_separator()
-        row_sep = table.build_row_separator()
+        self.__file = file
+        self.__titles = []
+
+    def write(self, row):
+        self.__file.write(json.dumps({'text': row}) + '\n')
 
-        header = table.build_header()
-        row_writer.write(header)
-        row_writer.write(header_sep)
+    def write_header(self, table):
+        self.__titles = [col.title for col in table.columns]
 
-        for line in lines_to_parse:
-            try:
-                row = table.build_row(line)
-            except ParseException as e:
-                print('!' * table.table_width)
-                print('Error while parsing line. Line:')
-                print(line)
-                print(e)
-                print('!' * table.table_width)
-                sys.exit()
+    def write_record(self, table, record):
+        if record.values is None:
+            item = {'description': record.line.rstrip('\n')}
+        else:
+            item = dict(zip(self.__titles, record.values))
+        if record.changelist is not None:
+            item['Changelist'] = record.changelist
+        self.__file.write(json.dumps(item) + '\n')
+
+
+class TeeRowWriter(RowWriter):
+    """
+    Class for writing the same rows to several row writers
+    """
+
+    def __init__(self, row_writers):
+        """
+        :param row_writers: List of elements of class 'RowWriter'
+        """
+        self.row_writers = list(row_writers)
+
+    def write(self, row):
+        for row_writer in self.row_writers:
             row_writer.write(row)
-            row_writer.write(row_sep)
+
+    def write_header(self, table):
+        for row_writer in self.row_writers:
+            row_writer.write_header(table)
+
+    def write_record(self, table, record):
+        for row_writer in self.row_writers:
+            row_writer.write_record(table, record)
+
+    def flush(self):
+        for row_writer in self.row_writers:
+            row_writer.flush()
+
+    def close(self):
+        for row_writer in self.row_writers:
+            row_writer.close()
+
+
+class ChangelistRowWriter(RowWriter):
+    """
+    Writes records of each changelist with its own row writer. Text rows are not written
+    """
+
+    def __init__(self, create_row_writer):
+        """
+        :param create_row_writer: Callable (changelist name or None for items without changelist) -> RowWriter.
+        Called once per changelist, when its first record is written
+        """
+        self.create_row_writer = create_row_writer
+        self.row_writers = {}  # changelist name -> RowWriter
+
+    def write_header(self, table):
+        pass
+
+    def write_record(self, table, record):
+        row_writer = self.row_writers.get(record.changelist)
+        if row_writer is None:
+            row_writer = self.row_writers[record.changelist] = self.create_row_writer(record.changelist)
+            row_writer.write_header(table)
+        row_writer.write_record(table, record)
+
+    def flush(self):
+        for row_writer in self.row_writers.values():
+            row_writer.flush()
+
+    def close(self):
+        for row_writer in self.row_writers.values():
+            row_writer.close()
+
+
+def changelist_file_name(changelist, used_names):
+    """
+    :param changelist: Changelist name or None for items without changelist
+    :param used_names: Set of file names already used. The returned name is added to it
+    :return: File name made of changelist name, e.g. 'release-1.2.txt'
+    """
+    stem = 'no-changelist' if changelist is None else re.sub(r'[^\w.-]+', '_', changelist).strip('.') or '_'
+    name = stem + '.txt'
+    suffix = 1
+    while name in used_names:
+        suffix += 1
+        name = '{}-{}.txt'.format(stem, suffix)
+    used_names.add(name)
+    return name
+
+
+class AsyncRowWriter(RowWriter):
+    """
+    Writes rows to another row writer in a background thread, so parsing and writing overlap.
+    Calls are passed in batches through a bounded queue: when writing falls behind, the caller waits.
+    Exception raised by the wrapped writer is raised again in the caller by the next call that passes a batch,
+    by 'flush' or by 'close'. Rows passed after the exception are discarded.
+    """
+    BATCH_SIZE = 1024  # calls per batch
+    QUEUE_SIZE = 16  # batches waiting to be written
+
+    def __init__(self, row_writer, batch_size=BATCH_SIZE, queue_size=QUEUE_SIZE):
+        """
+        :param row_writer: Element of class 'RowWriter'. Used only by the background thread until 'close'
+        """
+        self.row_writer = row_writer
+        self.batch_size = batch_size
+        self.__batch = []
+        self.__queue = queue.Queue(queue_size)
+        self.__error = None
+        self.__closed = False
+        self.__thread = threading.Thread(target=self.__run, name='AsyncRowWriter', daemon=True)
+        self.__thread.start()
+
+    def write(self, row):
+        self.__add(('write', row))
+
+    def write_header(self, table):
+        self.__add(('write_header', table))
+
+    def write_record(self, table, record):
+        self.__add(('write_record', table, record))
+
+    def flush(self):
+        self.__put_batch()
+        self.__queue.join()
+        self.__raise_error()
+        self.row_writer.flush()
+
+    def close(self):
+        """
+        Writes remaining rows, stops the background thread and closes the wrapped writer.
+        The thread is stopped and the wrapped writer is closed even if writing has failed
+        """
+        if self.__closed:
+            return
+        self.__closed = True
+        try:
+            self.__put_batch()
+        finally:
+            self.__queue.put(None)
+            self.__thread.join()
+            try:
+                self.__raise_error()
+            finally:
+                self.row_writer.close()
+
+    def __add(self, call):
+        batch = self.__batch
+        batch.append(call)
+        if len(batch) >= self.batch_size:
+            self.__put_batch()
+
+    def __put_batch(self):
+        self.__raise_error()
+        if self.__batch:
+            self.__queue.put(self.__batch)
+            self.__batch = []
+
+    def __raise_error(self):
+        if self.__error is not None:
+            error, self.__error = self.__error, None
+            self.__batch = []
+            raise error
+
+    def __run(self):
+        row_writer = self.row_writer
+        failed = False
+        while True:
+            batch = self.__queue.get()
+            try:
+                if batch is None:
+                    return
+                if failed:
+                    continue
+                for method, *args in batch:
+                    getattr(row_writer, method)(*args)
+            except BaseException as e:
+                self.__error = e
+                failed = True
+            finally:
+                self.__queue.task_done()
+
+
+class RowTemplate:
+    """
+    Row format over column names, e.g. '{status:1} {out_of_date:1} {path}'.
+    Format spec is the same as in str.format; bare width, e.g. ':1', crops value to width.
+    Compiled once into a plain format string. Only referenced columns are parsed, see 'columns'.
+    """
+
+    def __init__(self, template):
+        """
+        Raises ValueError if template is malformed or refers to unknown columns
+        """
+        self.template = template
+        by_name = {col.name: col for col in create_columns()}
+        self.names = []
+        parts = []
+        for literal, name, spec, conversion in string.Formatter().parse(template):
+            parts.append(literal.replace('{', '{{').replace('}', '}}'))
+            if name is None:
+                continue
+            if name not in by_name:
+                raise ValueError("unknown column: '{}'. Available columns: {}".format(name, ', '.join(by_name)))
+            if conversion is not None or '{' in spec:
+                raise ValueError("conversions and nested fields are not supported: '{}'".format(name))
+            if spec.isdigit():
+                spec = '<{w}.{w}'.format(w=spec)
+            if name not in self.names:
+                self.names.append(name)
+            parts.append('{{{}:{}}}'.format(self.names.index(name), spec))
+        self.__format = ''.join(parts).format
+        self.columns = [by_name[name] for name in self.names]
+        try:
+            self.format_row([''] * len(self.columns))
+        except ValueError as e:
+            raise ValueError('invalid format spec: {}'.format(e))
+
+    def format_row(self, values):
+        """
+        :param values: List of strings. One value per column of 'columns'
+        """
+        return self.__format(*values)
+
+    def format_record(self, record):
+        """
+        :param record: Record parsed with 'columns'. Conflict descriptions are returned as is
+        """
+        if record.values is None:
+            return record.line[:-1]
+        return self.__format(*record.values)
+
+
+class TemplateRowWriter(RowWriter):
+    """
+    Writes one line per record formatted with RowTemplate to another row writer. Header is not written.
+    Note set by RecordHook is appended to the line
+    """
+
+    def __init__(self, template, row_writer):
+        """
+        :param template: RowTemplate. Records must be parsed with its columns
+        :param row_writer: Element of class 'RowWriter' that gets the formatted lines
+        """
+        self.template = template
+        self.row_writer = row_writer
+
+    def write(self, row):
+        self.row_writer.write(row)
+
+    def write_header(self, table):
+        pass
+
+    def write_record(self, table, record):
+        line = self.template.format_record(record)
+        if record.note:
+            line += '  ' + record.note
+        self.row_writer.write(line)
+
+    def flush(self):
+        self.row_writer.flush()
+
+    def close(self):
+        self.row_writer.close()
+
+
+def parse_template(text):
+    """
+    :return: RowTemplate compiled from text
+    """
+    try:
+        return RowTemplate(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+class Record:
+    """
+    Parsed line of 'svn status -uv' output
+    """
+    __slots__ = ('line', 'values', 'note', 'changelist')
+
+    def __init__(self, line, values=None):
+        """
+        :param line: Source line. None for rows that are not parsed from 'svn status -uv' output
+        :param values: List of transformed values. One value per column. None if line is a conflict description
+        """
+        self.line = line
+        self.values = values
+        self.note = None  # annotation set by RecordHook
+        self.changelist = None  # name of changelist the item belongs to, see 'parse'
+
+    @property
+    def is_conflict_description(self):
+        return self.values is None
+
+
+def create_columns():
+    """
+    :return: List with a new instance of every column in the order of 'svn status -uv' output
+    """
+    return [
+        StatusColumn(),
+        PropertiesColumn(),
+        IsLockedColumn(),
+        AddWithHistColumn(),
+        SwitchedToParentColumn(),
+        LockInfoColumn(),
+        ConflictColumn(),
+        OutOfDateColumn(),
+        WorkingRevisionColumn(),
+        CommittedRevisionColumn(),
+        CommittedAuthorColumn(),
+        WorkingCopyPathColumn()
+    ]
+
+
+def select_columns(selection, columns):
+    """
+    :param selection: List of column names and indexes, e.g. ['status', 7, 'path']
+    :param columns: List of columns to select from
+    :return: List of selected columns in the order of selection
+    """
+    by_name = {col.name: col for col in columns}
+    selected = []
+    for key in selection:
+        if isinstance(key, int):
+            if not 0 <= key < len(columns):
+                raise ValueError('column index out of range: {}'.format(key))
+            selected.append(columns[key])
+        elif key in by_name:
+            selected.append(by_name[key])
+        else:
+            raise ValueError("unknown column: '{}'".format(key))
+    return selected
+
+
+def parse_column_selection(text):
+    """
+    Parses comma-separated list of column names and 0-based indexes, e.g. 'status,7,path'.
+    :return: List of names and indexes
+    """
+    columns = create_columns()
+    selection = [int(key) if key.strip().isdigit() else key.strip() for key in text.split(',') if key.strip()]
+    try:
+        select_columns(selection, columns)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError('{}. Available columns: {}'.format(
+            e, ', '.join('{} ({})'.format(col.name, i) for i, col in enumerate(columns))))
+    if not selection:
+        raise argparse.ArgumentTypeError('no columns selected')
+    return selection
+
+
+def create_table(widths=(), selection=None):
+    """
+    Creates the table that is used by the script
+    :param widths: Iterable of pairs (column index, width). Indexes refer to the list of all columns.
+    Indexes out of range are ignored
+    :param selection: List of column names and indexes to include. Default is all columns. See 'select_columns'.
+    Columns that are not selected are not parsed at all
+    """
+    columns = create_columns()
+    col_cnt = len(columns)
+    for [i, w] in widths:
+        if 0 <= i < col_cnt:
+            columns[i].width = w
+    if selection is not None:
+        columns = select_columns(selection, columns)
+    return Table(columns, left_separator='| ', right_separator=' |')
+
+
+def compile_table(widths=(), selection=None):
+    """
+    Same as 'create_table', but returns immutable TableSpec that can be shared between threads
+    """
+    return create_table(widths, selection).compile()
+
+
+def parse_line(line_to_parse, columns):
+    """
+    Parse line into values of columns. Transforms them into a readable form.
+    Can raise a ParseException if value can't be retrieved
+    :return: Record
+    """
+    if ConflictColumn().is_conflict_description(line_to_parse):
+        return Record(line_to_parse)
+    return Record(line_to_parse, [col.build_value(line_to_parse) for col in columns])
+
+
+CHANGELIST_HEADER = re.compile(r"^--- Changelist '(.*)':\s*$")
+CHANGELIST_HEADER_BYTES = re.compile(rb"^--- Changelist '(.*)':\s*$")
+
+
+def parse(lines_to_parse, columns=None):
+    """
+    Parse lines lazily. Nothing is printed, global state is not changed.
+    Changelist headers, e.g. "--- Changelist 'name':", and blank lines are not parsed as items.
+    Items that follow a header get its name in 'changelist' attribute.
+    Can raise a ParseException. Its 'line' and 'line_number' attributes describe the line that can't be parsed
+    :param lines_to_parse: Iterable of lines of 'svn status -uv' output
+    :param columns: List of columns to parse. Default is all columns, see 'create_columns'
+    :return: Generator of Record
+    """
+    columns = create_columns() if columns is None else columns
+    changelist = None
+    for line_number, line in enumerate(lines_to_parse, 1):
+        if line[:1] in ('-', '\n', '\r'):  # status of item is never '-'
+            header = CHANGELIST_HEADER.match(line)
+            if header is not None:
+                changelist = header.group(1)
+                continue
+            if not line.strip():
+                continue
+        try:
+            record = parse_line(line, columns)
+        except ParseException as e:
+            e.line = line
+            e.line_number = line_number
+            raise
+        record.changelist = changelist
+        yield record
+
+
+def parse_bytes_line(line_to_parse, columns, encoding='utf-8'):
+    """
+    Same as 'parse_line', but line is raw bytes. See Column.build_bytes_value.
+    Conflict descriptions are decoded. Other records keep the raw line.
+    :return: Record
+    """
+    if len(line_to_parse) > 6 and line_to_parse[6] == 0x3E:  # conflict description has '>' on the 7th position
+        return Record(line_to_parse.decode(encoding, 'surrogateescape'))
+    return Record(line_to_parse, [col.build_bytes_value(line_to_parse, encoding) for col in columns])
+
+
+def parse_bytes(lines_to_parse, columns=None, encoding='utf-8'):
+    """
+    Same as 'parse', but lines are raw bytes, e.g. lines of file opened in binary mode.
+    Only paths and authors are decoded, so dumps with paths in mixed or legacy encodings can be parsed.
+    Undecodable bytes are kept as surrogates, see 'surrogateescape' error handler.
+    The 'line' attribute of ParseException is decoded.
+    """
+    columns = create_columns() if columns is None else columns
+    changelist = None
+    for line_number, line in enumerate(lines_to_parse, 1):
+        if line[:1] in (b'-', b'\n', b'\r'):
+            header = CHANGELIST_HEADER_BYTES.match(line)
+            if header is not None:
+                changelist = header.group(1).decode(encoding, 'surrogateescape')
+                continue
+            if not line.strip():
+                continue
+        try:
+            record = parse_bytes_line(line, columns, encoding)
+        except ParseException as e:
+            e.line = line.decode(encoding, 'surrogateescape')
+            e.line_number = line_number
+            raise
+        record.changelist = changelist
+        yield record
+
+
+def parse_bytes_rows(lines_to_parse, encoding='utf-8'):
+    """
+    Same as 'parse_bytes' with all columns, but yields tuples of values instead of records.
+    Conflict descriptions and changelists are dropped, see 'SnapshotStore.ingest_rows'.
+    A line of controlled item is split once: flags are looked up by position,
+    revisions, author and path are taken from 'split(None, 3)' of the rest of line.
+    Other lines, e.g. of items that are not controlled, are parsed by columns.
+    Can raise a ParseException like 'parse_bytes'
+    :return: Generator of tuples of values in the order of 'create_columns'
+    """
+    columns = create_columns()
+    status, props, locked, history, switched, lock, conflict, out_of_date = \
+        [col._bytes_transformation_table() for col in columns[:8]]
+    parsed_by_columns = b'?I-'  # items that are not controlled, changelist headers
+    for line_number, line in enumerate(lines_to_parse, 1):
+        if len(line) > 10 and line[0] not in parsed_by_columns and line[6] != 0x3E:
+            tail = line[10:].split(None, 3)
+            if len(tail) == 4 and (line[8] != 0x2A or tail[0].isdigit() or tail[0] in (b'-', b'?')):
+                path = tail[3].strip()
+                if path:
+                    yield (status[line[0]], props[line[1]], locked[line[2]], history[line[3]],
+                           switched[line[4]], lock[line[5]], conflict[line[6]], out_of_date[line[8]],
+                           tail[0].decode('ascii', 'surrogateescape'), tail[1].decode('ascii', 'surrogateescape'),
+                           tail[2].decode(encoding, 'surrogateescape'), path.decode(encoding, 'surrogateescape'))
+                    continue
+        if line[:1] in (b'-', b'\n', b'\r') and (CHANGELIST_HEADER_BYTES.match(line) or not line.strip()):
+            continue
+        try:
+            record = parse_bytes_line(line, columns, encoding)
+        except ParseException as e:
+            e.line = line.decode(encoding, 'surrogateescape')
+            e.line_number = line_number
+            raise
+        if record.values is not None:
+            yield tuple(record.values)
+
+
+def render(records, table, row_writer, limit=None):
+    """
+    Writes header and records as table rows using specified row_writer.
+    Records are pulled one by one, so with lazy records, e.g. the result of 'parse',
+    nothing is read or parsed after the limit is reached or row_writer raises an exception.
+    :param records: Iterable of Record parsed with the columns of table, e.g. the result of 'parse'
+    :param row_writer: Element of class 'RowWriter'
+    :param limit: Max number of records to write. Default is all records
+    :return: Number of written records
+    """
+    if limit is not None:
+        records = itertools.islice(records, limit)
+    row_writer.write_header(table)
+    count = 0
+    for record in records:
+        row_writer.write_record(table, record)
+        count += 1
+    return count
+
+
+def format_parse_error(table, error):
+    """
+    :param error: ParseException raised by 'parse'
+    :return: Human-readable description of error
+    """
+    return '\n'.join(['!' * table.table_width,
+                      'Error while parsing line. Line:',
+                      str(error.line),
+                      str(error),
+                      '!' * table.table_width])
+
+
+class RecordHook:
+    """
+    Base class of custom checks of parsed records, e.g. 'no locked files under /release'.
+    Hook gets records in batches and can drop, annotate or count them. See HookPipeline
+    """
+    columns = ()  # names of columns the hook reads, see 'create_columns'. They are parsed even if not printed
+    annotates = False  # True if hook sets 'note' of records. Then notes are printed in additional column
+
+    def __init__(self):
+        self.counts = collections.Counter()  # counters reported in hook statistics
+
+    @property
+    def name(self):
+        return type(self).__name__
+
+    def process(self, records, index):
+        """
+        Checks batch of records. Conflict descriptions are passed too.
+        :param records: List of Record
+        :param index: Dict column name -> position of its value in Record.values
+        :return: List of records to keep. None means keep all records
+        """
+        return None
+
+
+class HookStatistics:
+    """
+    Run statistics of one hook
+    """
+
+    def __init__(self, hook):
+        self.hook = hook
+        self.batches = 0
+        self.records_in = 0
+        self.records_out = 0
+        self.seconds = 0.0
+
+
+class HookPipeline:
+    """
+    Passes records to hooks in batches and measures time spent in each hook
+    """
+    BATCH_SIZE = 1024
+
+    def __init__(self, hooks, columns, batch_size=BATCH_SIZE):
+        """
+        :param hooks: List of RecordHook. Each batch is passed to hooks in this order
+        :param columns: Columns records are parsed with. See 'hook_columns'
+        """
+        self.hooks = list(hooks)
+        self.index = {col.name: i for i, col in enumerate(columns)}
+        self.batch_size = batch_size
+        self.statistics = [HookStatistics(hook) for hook in self.hooks]
+        self.annotates = any(hook.annotates for hook in self.hooks)
+
+    def apply(self, records, keep=None):
+        """
+        :param records: Iterable of Record parsed with the columns of pipeline
+        :param keep: Number of leading values to keep in records passed by hooks, e.g. the number of table columns.
+        Notes are appended as the last value if some hook annotates. Default is to pass records as is
+        :return: Generator of records passed by all hooks
+        """
+        records = iter(records)
+        while True:
+            batch = list(itertools.islice(records, self.batch_size))
+            if not batch:
+                return
+            for statistics in self.statistics:
+                statistics.batches += 1
+                statistics.records_in += len(batch)
+                started = time.perf_counter()
+                kept = statistics.hook.process(batch, self.index)
+                statistics.seconds += time.perf_counter() - started
+                if kept is not None:
+                    batch = kept
+                statistics.records_out += len(batch)
+                if not batch:
+                    break
+            if keep is None:
+                yield from batch
+                continue
+            for record in batch:
+                if record.values is None:
+                    yield record
+                    continue
+                values = record.values[:keep]
+                if self.annotates:
+                    values.append(record.note or '')
+                projected = Record(record.line, values)
+                projected.note = record.note
+                projected.changelist = record.changelist
+                yield projected
+
+    def rows(self):
+        """
+        :return: List of statistics rows: hook name, batches, records in and out, seconds and counts
+        """
+        return [[statistics.hook.name, str(statistics.batches), str(statistics.records_in),
+                 str(statistics.records_out), '{:.3f}'.format(statistics.seconds),
+                 ', '.join('{} {}'.format(name, count) for name, count in sorted(statistics.hook.counts.items()))]
+                for statistics in self.statistics]
+
+
+def hook_columns(columns, hooks):
+    """
+    :param columns: Columns to print
+    :return: Columns to parse: columns to print followed by the other columns read by hooks
+    """
+    names = {col.name for col in columns}
+    extra = []
+    for hook in hooks:
+        for name in hook.columns:
+            if name not in names:
+                names.add(name)
+                extra.append(name)
+    return list(columns) + (select_columns(extra, create_columns()) if extra else [])
+
+
+def render_hook_statistics(pipeline, row_writer):
+    """
+    Writes hook statistics as text rows using specified row_writer
+    """
+    table = Table([Column(title='Hook', width=30, alignment='<'), Column(title='Batches', width=8, alignment='>'),
+                   Column(title='Records in', width=10, alignment='>'),
+                   Column(title='Records out', width=11, alignment='>'),
+                   Column(title='Seconds', width=8, alignment='>'), Column(title='Counts', width=40, alignment='<')],
+                  left_separator='| ', right_separator=' |')
+    row_writer.write(table.build_header())
+    row_writer.write(table.build_header_separator())
+    for row in pipeline.rows():
+        row_writer.write(table.format_row(row))
+        row_writer.write(table.build_row_separator())
+
+
+def load_hook(spec):
+    """
+    Creates hook from specification 'module:Class' or 'path/to/file.py:Class'. Class is created without arguments
+    :return: RecordHook
+    """
+    module_name, separator, class_name = spec.rpartition(':')
+    if not separator or not module_name or not class_name:
+        raise ValueError("hook must be given as 'module:Class' or 'file.py:Class'")
+    if module_name.endswith('.py'):
+        module_spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(module_name))[0],
+                                                             module_name)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+    hook_class = getattr(module, class_name)
+    if not isinstance(hook_class, type) or not issubclass(hook_class, RecordHook):
+        raise ValueError("'{}' is not a subclass of status.RecordHook".format(class_name))
+    hook = hook_class()
+    unknown = set(hook.columns) - {col.name for col in create_columns()}
+    if unknown:
+        raise ValueError("hook '{}' reads unknown columns: {}".format(class_name, ', '.join(sorted(unknown))))
+    return hook
+
+
+def parse_hook(spec):
+    """
+    :return: RecordHook created by 'load_hook'
+    """
+    try:
+        return load_hook(spec)
+    except (ImportError, OSError, AttributeError, ValueError) as e:
+        raise argparse.ArgumentTypeError("can't load hook '{}': {}".format(spec, e))
+
+
+class ProgressReporter:
+    """
+    Reports bytes and lines processed, throughput and ETA to stderr.
+    Clock is checked only every 'check_every' lines, so counting costs little per line.
+    On terminal the report is updated in place, otherwise one line is printed per report.
+    """
+    CHECK_EVERY = 4096
+    INTERVAL = 1.0  # seconds between reports
+
+    def __init__(self, total_bytes=None, stream=None, interval=INTERVAL, check_every=CHECK_EVERY, unit='lines'):
+        """
+        :param total_bytes: Size of input if known. Used for percentage and ETA
+        :param stream: Output stream. Default is stderr
+        :param unit: Name of counted items, e.g. 'lines' or 'files'
+        """
+        self.total_bytes = total_bytes
+        self.stream = sys.stderr if stream is None else stream
+        self.interval = interval
+        self.check_every = check_every
+        self.unit = unit
+        self.bytes = 0
+        self.count = 0
+        self.started = time.perf_counter()
+        self.__next_report = self.started + interval
+        self.__in_place = hasattr(self.stream, 'isatty') and self.stream.isatty()
+
+    def wrap(self, lines, binary_file=None):
+        """
+        Counts lines while they are read. The final report is printed when lines are exhausted or the generator
+        is closed, e.g. when reading stops at --limit, on a parse error or on a closed pipe
+        :param lines: Iterable of str or bytes
+        :param binary_file: Binary stream lines are decoded from. If given, bytes are measured by its position.
+        Otherwise by length of lines, which is the number of characters for str
+        :return: Generator of the same lines
+        """
+        check_every = self.check_every
+        size = 0
+        pending = 0
+        try:
+            for line in lines:
+                size += len(line)
+                pending += 1
+                if pending == check_every:
+                    if binary_file is not None:
+                        size = binary_file.tell() - self.bytes
+                    self.add(pending, size)
+                    size = pending = 0
+                yield line
+        finally:
+            if binary_file is not None and not binary_file.closed:
+                size = binary_file.tell() - self.bytes
+            self.count += pending
+            self.bytes += size
+            self.finish()
+
+    def add(self, count, size):
+        """
+        Adds processed items. Reports if interval has passed since the last report
+        """
+        self.count += count
+        self.bytes += size
+        now = time.perf_counter()
+        if now >= self.__next_report:
+            self.__next_report = now + self.interval
+            self.__write(self.format(now), final=False)
+
+    def finish(self):
+        self.__write(self.format(time.perf_counter()), final=True)
+
+    def format(self, now):
+        """
+        :return: Report, e.g. '12.0 MB, 250000 lines, 120000 lines/s, 40% ETA 0:00:03'
+        """
+        elapsed = max(now - self.started, 1e-9)
+        report = '{:.1f} MB, {} {}, {:.0f} {}/s'.format(self.bytes / 1e6, self.count, self.unit,
+                                                      self.count / elapsed, self.unit)
+        if self.total_bytes:
+            done = min(self.bytes / self.total_bytes, 1.0)
+            report += ', {:.0%}'.format(done)
+            if done > 0:
+                remaining = int(elapsed * (1 - done) / done)
+                report += ' ETA {}'.format(datetime.timedelta(seconds=remaining))
+        return report
+
+    def __write(self, report, final):
+        if self.__in_place:
+            self.stream.write('\r' + report + ('\n' if final else '\x1b[K'))
+        else:
+            self.stream.write(report + '\n')
+        self.stream.flush()
+
+
+class LineIndex:
+    """
+    Sidecar index of line offsets. Allows to read an arbitrary range of lines without reading the whole file.
+    Index file layout: header (magic, typecode, indexed size, CRC of the file head, CRC of the bytes before
+    indexed size, modification time and inode of file, count) + array of line ends.
+    """
+    MAGIC = b'SVNIDX2\0'
+    HEAD_SIZE = 4096  # number of leading and trailing bytes used to detect that file was replaced, not appended
+    CHUNK_SIZE = 1 << 20
+    __header = struct.Struct('<8sc7xQIIQQQ')
+
+    path = None
+    index_path = None
+    size = 0  # size of the indexed part of file
+    head_crc = 0
+    tail_crc = 0  # CRC of HEAD_SIZE bytes before 'size'
+    mtime_ns = 0
+    inode = 0
+    ends = None  # array of positions right after each '\n'
+
+    def __init__(self, path, index_path=None):
+        """
+        :param path: Path to the indexed file
+        :param index_path: Path to the sidecar index. By default it is '<path>.idx'
+        """
+        self.path = path
+        self.index_path = path + '.idx' if index_path is None else index_path
+        self.size = 0
+        self.head_crc = 0
+        self.tail_crc = 0
+        self.mtime_ns = 0
+        self.inode = 0
+        self.ends = array.array('I')
+
+    def update(self):
+        """
+        Loads the sidecar index and brings it up to date with the file.
+        The index is used as is if size, modification time and inode of the file are the same.
+        If the file has only grown, only the appended part is scanned: the file is treated as grown if it is the same
+        inode and the bytes at its head and right before the indexed size are the same. Otherwise the index is rebuilt.
+        The index is saved back if it was changed. If it can't be saved, it is kept only in memory.
+        :return: self
+        """
+        loaded = self.__load()
+        with open(self.path, 'rb') as file:
+            stat_result = os.fstat(file.fileno())
+            file_size = stat_result.st_size
+            if loaded and file_size == self.size and stat_result.st_mtime_ns == self.mtime_ns \
+                    and stat_result.st_ino == self.inode:
+                return self
+            if not loaded or file_size < self.size or stat_result.st_ino != self.inode \
+                    or self.__read_crc(file, 0, self.size) != self.head_crc \
+                    or self.__read_crc(file, max(self.size - self.HEAD_SIZE, 0), self.size) != self.tail_crc:
+                self.size = 0
+                self.ends = array.array('I')
+            self.__scan(file, file_size)
+            self.head_crc = self.__read_crc(file, 0, self.size)
+            self.tail_crc = self.__read_crc(file, max(self.size - self.HEAD_SIZE, 0), self.size)
+            self.mtime_ns = stat_result.st_mtime_ns
+            self.inode = stat_result.st_ino
+        self.__save()
+        return self
+
+    @property
+    def line_count(self):
+        """
+        Number of lines in the indexed part of file. Last line may not be terminated by '\\n'.
+        """
+        last_end = self.ends[-1] if self.ends else 0
+        return len(self.ends) + (1 if self.size > last_end else 0)
+
+    def offset(self, line_number):
+        """
+        :return: Position of the first byte of line. For line_number >= line_count returns size of indexed part.
+        """
+        if line_number <= 0:
+            return 0
+        if line_number > len(self.ends):
+            return self.size
+        return self.ends[line_number - 1]
+
+    def read_lines(self, start, end, encoding=None, binary=False):
+        """
+        Reads lines [start, end) using the index. Only the requested part of file is read.
+        :param end: None means 'till the end of the indexed part'
+        :param binary: Return raw lines. 'encoding' is ignored then
+        :return: Generator of decoded lines
+        """
+        count = self.line_count
+        end = count if end is None else min(end, count)
+        if start >= end:
+            return
+        begin = self.offset(start)
+        with open(self.path, 'rb') as file:
+            file.seek(begin)
+            stream = file if binary else io.TextIOWrapper(file, encoding=encoding)
+            yield from itertools.islice(stream, end - start)
+
+    def __scan(self, file, file_size):
+        """
+        Appends ends of lines in [self.size, file_size) to the index
+        """
+        ends = self.ends
+        position = self.size
+        file.seek(position)
+        while position < file_size:
+            chunk = file.read(min(self.CHUNK_SIZE, file_size - position))
+            if not chunk:
+                break
+            if ends.typecode == 'I' and file_size > 0xFFFFFFFF:
+                ends = array.array('Q', ends)
+            found = chunk.find(b'\n')
+            while found >= 0:
+                ends.append(position + found + 1)
+                found = chunk.find(b'\n', found + 1)
+            position += len(chunk)
+        self.ends = ends
+        self.size = position
+
+    def __read_crc(self, file, start, end):
+        """
+        :return: CRC of bytes [start, min(end, start + HEAD_SIZE))
+        """
+        file.seek(start)
+        return zlib.crc32(file.read(max(min(end - start, self.HEAD_SIZE), 0)))
+
+    def __load(self):
+        """
+        :return: True if a valid index was loaded. Else False.
+        """
+        try:
+            with open(self.index_path, 'rb') as index_file:
+                header = index_file.read(self.__header.size)
+                if len(header) != self.__header.size:
+                    return False
+                magic, typecode, size, head_crc, tail_crc, mtime_ns, inode, count = self.__header.unpack(header)
+                if magic != self.MAGIC or typecode not in (b'I', b'Q'):
+                    return False
+                ends = array.array(typecode.decode())
+                ends.fromfile(index_file, count)
+        except (OSError, EOFError, struct.error):
+            return False
+        self.size = size
+        self.head_crc = head_crc
+        self.tail_crc = tail_crc
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.ends = ends
+        return True
+
+    def __save(self):
+        """
+        :return: True if the index was saved. Else False, e.g. if directory is read-only. The index is still usable
+        """
+        try:
+            with open(self.index_path, 'wb') as index_file:
+                index_file.write(self.__header.pack(self.MAGIC, self.ends.typecode.encode(), self.size,
+                                                    self.head_crc, self.tail_crc, self.mtime_ns, self.inode,
+                                                    len(self.ends)))
+                self.ends.tofile(index_file)
+        except OSError:
+            return False
+        return True
+
+
+def parse_line_range(text):
+    """
+    Parses 'START:END' string. Lines are 0-based, END is exclusive. Both bounds may be omitted.
+    :return: Tuple (start, end). end is None if omitted.
+    """
+    start, sep, end = text.partition(':')
+    try:
+        start = int(start) if start.strip() else 0
+        end = int(end) if end.strip() else None
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid range: '{}'. Expected START:END".format(text))
+    if not sep or start < 0 or (end is not None and end < start):
+        raise argparse.ArgumentTypeError("invalid range: '{}'. Expected START:END".format(text))
+    return start, end
+
+
+COMPRESSION_MAGIC = [
+    (b'\x1f\x8b', 'gz'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz')
+]
+
+COMPRESSION_OPENERS = {
+    'gz': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open
+}
+
+
+def detect_compression(binary_file):
+    """
+    Detects compression of stream by its magic bytes. Stream position is not changed.
+    :param binary_file: Buffered binary stream, e.g. the result of open(path, 'rb')
+    :return: 'gz', 'bz2', 'xz' or None if stream is not compressed
+    """
+    head = binary_file.peek(8)
+    for magic, compression in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def open_input(path, encoding=None, binary=False):
+    """
+    Opens file for reading in text mode. gzip, bz2 and xz files are decompressed on the fly.
+    :param path: Path to file. '-' means stdin
+    :param binary: Open in binary mode. 'encoding' is ignored then
+    """
+    binary_file = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    compression = detect_compression(binary_file)
+    if compression is not None:
+        binary_file = COMPRESSION_OPENERS[compression](binary_file, 'rb')
+    if binary:
+        return binary_file
+    return io.TextIOWrapper(binary_file, encoding=encoding)
+
+
+def open_output(path, encoding=None, errors=None):
+    """
+    Opens file for writing in text mode. Output is compressed if path ends with '.gz', '.bz2' or '.xz'
+    :param path: Path to file. '-' means stdout
+    :param errors: Encoding error handler, e.g. 'surrogateescape'
+    """
+    if path == '-':
+        return sys.stdout
+    compression = os.path.splitext(path)[1][1:]
+    if compression in COMPRESSION_OPENERS:
+        return COMPRESSION_OPENERS[compression](path, 'wt', encoding=encoding, errors=errors)
+    return open(path, 'w', encoding=encoding, errors=errors)
+
+
+INPUT_ERRORS = (OSError, EOFError, UnicodeError, lzma.LZMAError, zlib.error)  # e.g. truncated or corrupt archive
+BATCH_ERRORS = (ParseException,) + INPUT_ERRORS
+
+_batch_table = None  # table shared by all files rendered in a batch worker process
+_batch_template = None  # RowTemplate used instead of table rows, see 'render_section'
+
+
+class BatchResult:
+    """
+    Result of rendering one file in batch mode
+    """
+
+    def __init__(self, input_path, output_path, lines=0, seconds=0.0, error=None):
+        """
+        :param lines: Number of rendered lines
+        :param seconds: Rendering time
+        :param error: Error message or None if file was rendered successfully
+        """
+        self.input_path = input_path
+        self.output_path = output_path
+        self.lines = lines
+        self.seconds = seconds
+        self.error = error
+
+
+def expand_inputs(patterns):
+    """
+    Expands glob patterns. Patterns without wildcards and patterns that match nothing are kept as is.
+    :return: List of paths
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if any(c in pattern for c in '*?[') else []
+        paths.extend(matches if matches else [pattern])
+    return paths
+
+
+def batch_output_path(input_path, output_dir):
+    """
+    :return: Path of the table file for input_path, e.g. 'dir/checkout.status.gz' -> 'output_dir/checkout.txt'
+    """
+    name = os.path.basename(input_path)
+    base, extension = os.path.splitext(name)
+    if extension[1:] in COMPRESSION_OPENERS:
+        name = base
+    return os.path.join(output_dir, os.path.splitext(name)[0] + '.txt')
+
+
+def render_file(input_path, output_path, table=None, encoding=None, template=None):
+    """
+    Renders file into table file. Errors are reported via result rather than raised.
+    :param table: Table to use. Default is the table of batch worker process
+    :param encoding: Parse input as raw bytes and decode paths and authors with this encoding, see 'parse_bytes'.
+    Default is to parse input as text
+    :param template: RowTemplate to format items with instead of table rows. Default is the template of
+    batch worker process if table is not given
+    :return: BatchResult
+    """
+    if table is None:
+        table, template = _batch_table, _batch_template
+    started = time.perf_counter()
+    result = BatchResult(input_path, output_path)
+    binary = encoding is not None
+    try:
+        with open_input(input_path, binary=binary) as input_file, \
+                open_output(output_path, errors='surrogateescape' if binary else None) as output:
+            records = parse_bytes(input_file, table.columns, encoding) if binary else parse(input_file, table.columns)
+            row_writer = FileRowWriter(output)
+            if template is not None:
+                row_writer = TemplateRowWriter(template, row_writer)
+            result.lines = render(records, table, row_writer)
+    except ParseException as e:
+        result.error = '{} Line: {}'.format(e, e.line.rstrip('\n'))
+    except BATCH_ERRORS as e:
+        result.error = str(e)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _init_batch_worker(table, template=None):
+    global _batch_table, _batch_template
+    _batch_table = table
+    _batch_template = template
+
+
+def render_batch(table, input_paths, output_dir, jobs=None, on_result=None, encoding=None, template=None):
+    """
+    Renders files in parallel. Each file is rendered into its own table file in output_dir.
+    Table and template are sent to each worker process once.
+    :param jobs: Number of worker processes. Default is the number of CPUs
+    :param on_result: Callable that gets each BatchResult as soon as the file is rendered
+    :param encoding: See 'render_file'
+    :param template: RowTemplate to format items with instead of table rows. Table must have its columns
+    :return: List of BatchResult in the order of input_paths
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker,
+                                                initargs=(table, template)) as executor:
+        futures = [executor.submit(render_file, path, batch_output_path(path, output_dir), None, encoding)
+                   for path in input_paths]
+        if on_result is not None:
+            for future in concurrent.futures.as_completed(futures):
+                on_result(future.result())
+        return [future.result() for future in futures]
+
+
+EXTERNAL_HEADER = re.compile(r"^Performing status on external item at '(.*)':\s*$")
+STATUS_AGAINST_REVISION = re.compile(r'^Status against revision:\s*(\d+)\s*$')
+
+
+class Section:
+    """
+    Part of 'svn status -uv' output: items of working copy or of one external
+    """
+    __slots__ = ('external', 'revision', 'lines', 'start')
+
+    def __init__(self, external=None, start=1):
+        """
+        :param external: Path of external from its header or None for the working copy itself
+        :param start: Number of the first line of section in the whole output
+        """
+        self.external = external
+        self.revision = None  # value of 'Status against revision' line
+        self.lines = []  # item lines. Same type as input lines
+        self.start = start
+
+    @property
+    def title(self):
+        title = 'Working copy' if self.external is None else "External item at '{}'".format(self.external)
+        if self.revision is not None:
+            title += ' (status against revision {})'.format(self.revision)
+        return title
+
+
+def split_sections(lines_to_parse, encoding='utf-8'):
+    """
+    Splits output into the working copy section and one section per external.
+    Headers of externals and 'Status against revision' lines are captured as metadata of sections,
+    blank lines are dropped.
+    :param lines_to_parse: Iterable of lines. Can be bytes, then headers are decoded using 'encoding'
+    :return: Generator of Section. Sections without items and revision are skipped
+    """
+    section = Section()
+    for line_number, line in enumerate(lines_to_parse, 1):
+        if isinstance(line, bytes):
+            if line.startswith((b'Performing ', b'Status against ')):
+                text = line.decode(encoding, 'surrogateescape')
+            else:
+                text = None if line.strip() else ''
+        else:
+            text = line if line.startswith(('Performing ', 'Status against ')) or not line.strip() else None
+        if text is None:
+            if not section.lines:
+                section.start = line_number
+            section.lines.append(line)
+            continue
+        header = EXTERNAL_HEADER.match(text)
+        if header is not None:
+            if section.lines or section.revision is not None:
+                yield section
+            section = Section(header.group(1), line_number + 1)
+            continue
+        revision = STATUS_AGAINST_REVISION.match(text)
+        if revision is not None:
+            section.revision = revision.group(1)
+        elif text.strip():
+            if not section.lines:
+                section.start = line_number
+            section.lines.append(line)
+    if section.lines or section.revision is not None:
+        yield section
+
+
+class SectionResult:
+    """
+    Rendered section
+    """
+
+    def __init__(self, section):
+        self.external = section.external
+        self.revision = section.revision
+        self.title = section.title
+        self.items = 0
+        self.statuses = {}  # readable status -> number of items
+        self.out_of_date = 0
+        self.text = ''
+        self.error = None
+        self.seconds = 0.0
+
+    @property
+    def summary(self):
+        statuses = ', '.join('{} {}'.format(item_status.strip() or 'Unchanged', count)
+                             for item_status, count in sorted(self.statuses.items(), key=lambda item: -item[1]))
+        return '{} items{}; {} out of date; {:.3f} seconds'.format(
+            self.items, ': ' + statuses if statuses else '', self.out_of_date, self.seconds)
+
+
+def render_section(section, table=None, template=None, encoding='utf-8'):
+    """
+    Renders items of section into text and counts them by status. Parse errors are reported via result.
+    :param table: Table to use. Default is the table of batch worker process
+    :param template: RowTemplate to format items with instead of table rows. Default is the template of
+    batch worker process if table is not given
+    :param encoding: Encoding of paths if lines are bytes, see 'parse_bytes'
+    :return: SectionResult
+    """
+    if table is None:
+        table, template = _batch_table, _batch_template
+    started = time.perf_counter()
+    result = SectionResult(section)
+    output = io.StringIO()
+    row_writer = FileRowWriter(output)
+    if template is not None:
+        row_writer = TemplateRowWriter(template, row_writer)
+    binary = bool(section.lines) and isinstance(section.lines[0], bytes)
+    records = parse_bytes(section.lines, table.columns, encoding) if binary else parse(section.lines, table.columns)
+    try:
+        result.items = render(records, table, row_writer)
+    except ParseException as e:
+        e.line_number += section.start - 1
+        result.error = format_parse_error(table, e)
+    status_column = StatusColumn()
+    changelist_header = CHANGELIST_HEADER_BYTES if binary else CHANGELIST_HEADER
+    for line in section.lines:
+        if line[6:7] in ('>', b'>') or not line.strip():
+            continue
+        if line[:1] in ('-', b'-') and changelist_header.match(line):
+            continue
+        flag = line[:1].decode('latin-1') if binary else line[:1]
+        item_status = status_column._transform_value(flag)
+        result.statuses[item_status] = result.statuses.get(item_status, 0) + 1
+        if line[8:9] in ('*', b'*'):
+            result.out_of_date += 1
+    result.text = output.getvalue()
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def render_sections(sections, table, template=None, jobs=None, encoding='utf-8'):
+    """
+    Renders sections in parallel worker processes. Table is sent to each worker process once.
+    At most 2 sections per worker are queued, so the whole output is never held in memory.
+    :param sections: Iterable of Section, e.g. the result of 'split_sections'
+    :param jobs: Number of worker processes. Default is the number of CPUs
+    :return: Generator of SectionResult in the order of sections
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker,
+                                                initargs=(table, template)) as executor:
+        pending = collections.deque()
+        limit = 2 * (jobs or os.cpu_count() or 1)
+        for section in sections:
+            pending.append(executor.submit(render_section, section, encoding=encoding))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def path_key(path):
+    """
+    Normalizes path for comparison. Separators '/' and '\\' are equal, empty and '.' parts are dropped.
+    :return: Tuple of path parts. Key of the working copy root is ()
+    """
+    return tuple(PathTrie.split_path(path))
+
+
+def group_items(records):
+    """
+    Groups each item with the conflict descriptions that follow it
+    :param records: Iterable of Record parsed with WorkingCopyPathColumn as the first column
+    :return: Generator of pairs (path key, list of source lines)
+    """
+    key = ()
+    lines = None
+    for record in records:
+        if record.values is None:
+            if lines is None:
+                lines = []
+            lines.append(record.line)
+            continue
+        if lines is not None:
+            yield key, lines
+        key = path_key(record.values[0])
+        lines = [record.line]
+    if lines is not None:
+        yield key, lines
+
+
+def is_sorted_by_path(items):
+    """
+    :param items: Iterable of pairs (path key, lines) as returned by 'group_items'
+    """
+    previous = None
+    for key, _ in items:
+        if previous is not None and key < previous:
+            return False
+        previous = key
+    return True
+
+
+def _ranked(items, rank):
+    """
+    Adds rank to items and checks that they are sorted by path
+    """
+    previous = None
+    for key, lines in items:
+        if previous is not None and key < previous:
+            e = ParseException('Input is not sorted by path. Merge it without --sorted')
+            e.line = lines[0]
+            raise e
+        previous = key
+        yield key, -rank, lines
+
+
+def merge_sorted(inputs):
+    """
+    Streaming k-way merge of inputs sorted by path. Only the current item of each input is held in memory.
+    Raises a ParseException when an item of input is out of order.
+    :param inputs: List of iterables of pairs (path key, lines) sorted by path key. Later inputs are newer
+    :return: Generator of lines in path order. Of items with the same path only the one from the newest input is kept
+    """
+    previous = None
+    merged = heapq.merge(*[_ranked(items, rank) for rank, items in enumerate(inputs)], key=lambda item: item[:2])
+    for key, _, lines in merged:
+        if key == previous:
+            continue
+        previous = key
+        yield from lines
+
+
+def merge_unsorted(inputs):
+    """
+    Same as 'merge_sorted', but inputs can be in any order. Items are kept in memory until all inputs are read:
+    source lines only, keyed by interned parent directory and name, so directories are stored once.
+    :return: Generator of lines in the order items are first seen
+    """
+    items = {}
+    for input_items in inputs:
+        for key, lines in input_items:
+            compact_key = (sys.intern('/'.join(key[:-1])), key[-1]) if key else ('', '')
+            items[compact_key] = lines[0] if len(lines) == 1 else tuple(lines)
+    for lines in items.values():
+        if isinstance(lines, tuple):
+            yield from lines
+        else:
+            yield lines
+
+
+class TableCache:
+    """
+    Thread-safe cache of compiled tables built for width configurations and column selections
+    """
+    MAX_SIZE = 64
+
+    def __init__(self, prebuilt=(((), None),)):
+        """
+        :param prebuilt: Pairs (widths, selection) to build tables for in advance. See 'create_table'
+        """
+        self.__lock = threading.Lock()
+        self.__tables = {}
+        for widths, selection in prebuilt:
+            self.get(widths, selection)
+
+    def get(self, widths, selection=None):
+        """
+        :param widths: Iterable of pairs (column index, width)
+        :param selection: List of column names and indexes or None for all columns
+        :return: TableSpec shared between threads
+        """
+        widths = tuple(sorted(dict(tuple(pair) for pair in widths).items()))  # the last width of a column wins
+        selection = None if selection is None else tuple(selection)
+        key = (widths, selection)
+        with self.__lock:
+            table = self.__tables.get(key)
+        if table is None:
+            table = compile_table(widths, selection)
+            with self.__lock:
+                if len(self.__tables) < self.MAX_SIZE:
+                    table = self.__tables.setdefault(key, table)
+        return table
+
+
+class RenderRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handles a render request of daemon.
+    Request: JSON header line, e.g. '{"width": [[0, 10]], "columns": ["status", 11]}',
+    followed by 'svn status -uv' output.
+    Response: JSON header line '{"exit_code": N}' followed by the rendered table or error description.
+    """
+
+    def handle(self):
+        try:
+            header = json.loads(self.rfile.readline().decode('utf-8') or '{}')
+            table = self.server.table_cache.get(header.get('width', []), header.get('columns'))
+        except (ValueError, TypeError, AttributeError) as e:
+            self.__respond(2, 'Bad request: {}\n'.format(e))
+            return
+        lines = self.rfile.read().decode('utf-8', 'surrogateescape').splitlines(keepends=True)
+        output = io.StringIO()
+        try:
+            render(parse(lines, table.columns), table, FileRowWriter(output))
+            exit_code = 0
+        except ParseException as e:
+            output.write(format_parse_error(table, e) + '\n')
+            exit_code = 1
+        self.__respond(exit_code, output.getvalue())
+
+    def __respond(self, exit_code, text):
+        self.wfile.write(json.dumps({'exit_code': exit_code}).encode('utf-8') + b'\n')
+        self.wfile.write(text.encode('utf-8', 'surrogateescape'))
+
+
+def create_server(socket_path, prebuilt=(((), None),)):
+    """
+    Creates daemon server on Unix socket. Each client is handled in its own thread.
+    :param prebuilt: Pairs (widths, selection) to build tables for in advance
+    :return: socketserver.ThreadingUnixStreamServer
+    """
+    if not hasattr(socketserver, 'ThreadingUnixStreamServer'):
+        raise OSError('Unix sockets are not supported on this platform')
+    if os.path.exists(socket_path):
+        if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            raise OSError("path exists and is not a socket: '{}'".format(socket_path))
+        try:
+            request_render(socket_path, '')
+        except OSError:
+            os.unlink(socket_path)  # stale socket of a daemon that is not running anymore
+        else:
+            raise OSError("daemon is already running on '{}'".format(socket_path))
+    server = socketserver.ThreadingUnixStreamServer(socket_path, RenderRequestHandler)
+    server.daemon_threads = True
+    server.table_cache = TableCache(prebuilt)
+    return server
+
+
+def serve(socket_path, prebuilt=(((), None),)):
+    """
+    Serves render requests on Unix socket until interrupted. See 'create_server'
+    """
+    server = create_server(socket_path, prebuilt)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+
+
+def request_render(socket_path, text, widths=(), selection=None):
+    """
+    Sends render request to daemon. See 'serve'.
+    Raises OSError if daemon is not running or the response is malformed.
+    :param text: 'svn status -uv' output
+    :param widths: Iterable of pairs (column index, width)
+    :param selection: List of column names and indexes or None for all columns
+    :return: Tuple (exit_code, rendered text)
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        raise OSError('Unix sockets are not supported on this platform')
+    request = {'width': [list(pair) for pair in widths]}
+    if selection is not None:
+        request['columns'] = list(selection)
+    header = json.dumps(request).encode('utf-8') + b'\n'
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(header + text.encode('utf-8', 'surrogateescape'))
+        client.shutdown(socket.SHUT_WR)
+        with client.makefile('rb') as response:
+            header = response.readline()
+            body = response.read()
+    try:
+        exit_code = json.loads(header.decode('utf-8'))['exit_code']
+    except (ValueError, KeyError, TypeError):
+        raise ConnectionError('malformed response from daemon')
+    return exit_code, body.decode('utf-8', 'surrogateescape')
+
+
+class PathTrieNode:
+    """
+    Directory node of PathTrie
+    """
+    __slots__ = ('children', 'counts')
+
+    def __init__(self, counters_count):
+        self.children = {}
+        self.counts = array.array('L', bytes(array.array('L').itemsize * counters_count))
+
+
+class PathTrie:
+    """
+    Trie of directories with counters. Item is counted in its directory and in all ancestors of the directory.
+    Directories deeper than 'depth' are not stored. Their items are counted in the ancestor at 'depth'.
+    """
+    __separators = re.compile(r'[\\/]')
+
+    def __init__(self, depth, counters_count):
+        """
+        :param depth: Max depth of stored directories. Root has depth 0
+        :param counters_count: Number of counters per directory
+        """
+        self.depth = depth
+        self.counters_count = counters_count
+        self.root = PathTrieNode(counters_count)
+
+    @classmethod
+    def split_path(cls, path):
+        """
+        Splits path both on '/' and '\\'. Empty and '.' parts are dropped.
+        :return: List of path parts
+        """
+        return [part for part in cls.__separators.split(path) if part and part != '.']
+
+    def add(self, path, counters):
+        """
+        Counts item in its directory and all ancestors
+        :param path: Path of item
+        :param counters: Sequence of increments. One per counter
+        """
+        directories = self.split_path(path)[:-1][:self.depth]
+        node = self.root
+        self.__increment(node, counters)
+        for part in directories:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = PathTrieNode(self.counters_count)
+            node = child
+            self.__increment(node, counters)
+
+    def rows(self):
+        """
+        Walks the trie in depth-first order. Directories are sorted by name.
+        :return: Generator of pairs (directory path, counts). Path of root is '.'
+        """
+        stack = [('.', self.root)]
+        while stack:
+            path, node = stack.pop()
+            yield path, node.counts
+            prefix = '' if node is self.root else path + '/'
+            for name in sorted(node.children, reverse=True):
+                stack.append((prefix + name, node.children[name]))
+
+    @staticmethod
+    def __increment(node, counters):
+        counts = node.counts
+        for i, increment in enumerate(counters):
+            if increment:
+                counts[i] += increment
+
+
+ROLLUP_COUNTERS = ['Items', 'Modified', 'Conflicts', 'Out of date', 'Not controlled']
+
+
+def create_rollup_columns():
+    """
+    :return: Columns that are needed to build rollup. See 'rollup'
+    """
+    return [StatusColumn(), PropertiesColumn(), ConflictColumn(), OutOfDateColumn(), WorkingCopyPathColumn()]
+
+
+def rollup(records, depth):
+    """
+    Counts items per directory. See ROLLUP_COUNTERS for the list of counters.
+    :param records: Iterable of Record parsed with the columns returned by 'create_rollup_columns'
+    :param depth: Max depth of directories
+    :return: PathTrie
+    """
+    modified = {StatusColumn().build_value(flag) for flag in 'MADR~'}
+    trie = PathTrie(depth, len(ROLLUP_COUNTERS))
+    for record in records:
+        if record.is_conflict_description:
+            continue
+        item_status, properties, tree_conflict, out_of_date, path = record.values
+        trie.add(path, (1,
+                        1 if item_status in modified or properties == 'Modified' else 0,
+                        1 if item_status == 'Conflicts' or properties == 'Conflict' or tree_conflict == 'Conflict'
+                        else 0,
+                        1 if out_of_date == 'Out of date' else 0,
+                        1 if item_status == 'Not controlled' else 0))
+    return trie
+
+
+def render_rollup(trie, row_writer):
+    """
+    Writes one row per directory using specified row_writer. Counter columns are as wide as the largest count
+    """
+    rows = [[path] + [str(count) for count in counts] for path, counts in trie.rows()]
+    columns = [Column(title='Directory', width=50, alignment='<')]
+    columns += [Column(title=title, width=max([len(title)] + [len(row[i]) for row in rows]), alignment='>')
+                for i, title in enumerate(ROLLUP_COUNTERS, 1)]
+    table = Table(columns, left_separator='| ', right_separator=' |')
+    render((Record(None, row) for row in rows), table, row_writer)
+
+
+class UpdatePlanNode:
+    """
+    Node of UpdatePlanner. Nodes are created for directories and out of date items only
+    """
+    __slots__ = ('children', 'entries', 'out_of_date')
+
+    def __init__(self):
+        self.children = {}
+        self.entries = 0  # number of items directly in directory
+        self.out_of_date = False
+
+
+class UpdatePlanner:
+    """
+    Folds out of date items into the smallest set of 'svn update' targets.
+    Directory is updated as a whole when the share of its entries that are updated as a whole reaches threshold,
+    otherwise the targets of its entries are used.
+    """
+    THRESHOLD = 0.5
+
+    def __init__(self, threshold=THRESHOLD):
+        """
+        :param threshold: Share of entries of directory, from 0 to 1. 0 means update the whole working copy
+        if anything is out of date, 1 means update directory only if all its entries are out of date
+        """
+        self.threshold = threshold
+        self.root = UpdatePlanNode()
+
+    def add(self, path, out_of_date):
+        """
+        Counts item in its directory. Out of date items are stored
+        """
+        parts = PathTrie.split_path(path)
+        if not parts:
+            self.root.out_of_date = self.root.out_of_date or out_of_date
+            return
+        node = self.root
+        for part in parts[:-1]:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = UpdatePlanNode()
+            node = child
+        node.entries += 1
+        if out_of_date:
+            child = node.children.get(parts[-1])
+            if child is None:
+                child = node.children[parts[-1]] = UpdatePlanNode()
+            child.out_of_date = True
+
+    def targets(self):
+        """
+        :return: Sorted list of paths to update. Path of the working copy root is '.'
+        """
+        return sorted(self.__targets(self.root, '.'))
+
+    def __targets(self, node, path):
+        if node.out_of_date:
+            return [path]
+        targets = []
+        updated_entries = 0  # entries that are targets as a whole
+        prefix = '' if node is self.root else path + '/'
+        for name, child in node.children.items():
+            child_path = prefix + name
+            child_targets = self.__targets(child, child_path)
+            if child_targets == [child_path]:
+                updated_entries += 1
+            targets.extend(child_targets)
+        if updated_entries and updated_entries >= self.threshold * max(node.entries, updated_entries):
+            return [path]
+        return targets
+
+
+def create_update_plan_columns():
+    """
+    :return: Columns that are needed to plan update. See 'plan_update'
+    """
+    return [OutOfDateColumn(), WorkingCopyPathColumn()]
+
+
+def plan_update(records, threshold=UpdatePlanner.THRESHOLD):
+    """
+    Collects out of date items in one pass. See UpdatePlanner.
+    :param records: Iterable of Record parsed with the columns returned by 'create_update_plan_columns'
+    :return: Sorted list of paths to update
+    """
+    planner = UpdatePlanner(threshold)
+    for record in records:
+        if record.is_conflict_description:
+            continue
+        out_of_date, path = record.values
+        planner.add(path, out_of_date == 'Out of date')
+    return planner.targets()
+
+
+def import_numpy():
+    """
+    Imports NumPy on first call, so runs that don't compute statistics don't pay for its import
+    :return: numpy module or None if it is not installed
+    """
+    global numpy
+    if numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+    return numpy or None
+
+
+class RevisionStatistics:
+    """
+    Collects working and committed revisions and computes statistics over them.
+    Revisions are converted to integer arrays in batches. NumPy is used if it is installed.
+    Items without numeric revisions (e.g. not controlled or scheduled for addition) are skipped.
+    """
+    BATCH_SIZE = 65536
+    PERCENTILES = [50, 90, 99]
+    GAP_EDGES = [1, 10, 100, 1000, 10000, 100000]  # histogram buckets of 'working - committed' gaps
+
+    def __init__(self, use_numpy=None):
+        """
+        :param use_numpy: Whether to use NumPy. Default is True if NumPy is installed
+        """
+        self.use_numpy = import_numpy() is not None if use_numpy is None else use_numpy
+        if self.use_numpy and import_numpy() is None:
+            raise ImportError('NumPy is not installed')
+        self.head = None  # revision of 'Status against revision' line. HEAD is the max revision seen if it is None
+        self.externals = 0  # number of externals whose items are not included
+        self.__pending_working = []
+        self.__pending_committed = []
+        self.__working = []  # list of numpy arrays or a single array.array
+        self.__committed = []
+        if not self.use_numpy:
+            self.__working = array.array('q')
+            self.__committed = array.array('q')
+
+    def add(self, working_revision, committed_revision):
+        """
+        :param working_revision: String value of WorkingRevisionColumn
+        :param committed_revision: String value of CommittedRevisionColumn
+        """
+        if working_revision.isdigit() and committed_revision.isdigit():
+            self.__pending_working.append(working_revision)
+            self.__pending_committed.append(committed_revision)
+            if len(self.__pending_working) >= self.BATCH_SIZE:
+                self.__flush()
+
+    def rows(self):
+        """
+        Computes statistics
+        :return: List of pairs (statistic title, value)
+        """
+        self.__flush()
+        if self.use_numpy:
+            working = numpy.concatenate(self.__working) if self.__working else numpy.zeros(0, numpy.int64)
+            committed = numpy.concatenate(self.__committed) if self.__committed else numpy.zeros(0, numpy.int64)
+            count = int(working.size)
+        else:
+            working = self.__working
+            committed = self.__committed
+            count = len(working)
+        rows = [('Items with revisions', str(count))]
+        if self.externals:
+            rows.append(('Externals (not included)', str(self.externals)))
+        if count == 0:
+            return rows
+
+        if self.use_numpy:
+            sorted_working = numpy.sort(working)
+            sorted_committed = numpy.sort(committed)
+            head = int(max(sorted_working[-1], sorted_committed[-1])) if self.head is None else self.head
+            sorted_behind = head - sorted_working[::-1]
+            distinct = int(numpy.unique(sorted_working).size)
+            gaps = working - committed
+            buckets = numpy.bincount(numpy.searchsorted(self.GAP_EDGES, gaps, side='right'),
+                                     minlength=len(self.GAP_EDGES) + 1)
+        else:
+            sorted_working = sorted(working)
+            sorted_committed = sorted(committed)
+            head = max(sorted_working[-1], sorted_committed[-1]) if self.head is None else self.head
+            sorted_behind = [head - w for w in reversed(sorted_working)]
+            distinct = len(set(working))
+            buckets = [0] * (len(self.GAP_EDGES) + 1)
+            for w, c in zip(working, committed):
+                buckets[bisect.bisect_right(self.GAP_EDGES, w - c)] += 1
+
+        rows.append(('HEAD (max revision seen)' if self.head is None else 'HEAD (status against revision)', str(head)))
+        rows += self.__describe('Working revision', sorted_working)
+        rows += self.__describe('Committed revision', sorted_committed)
+        rows += self.__describe('Behind HEAD', sorted_behind)
+        rows.append(('Items behind HEAD', str(count - bisect.bisect_left(sorted_behind, 1))))
+        rows.append(('Mixed revisions', 'yes ({} distinct working revisions)'.format(distinct) if distinct > 1
+                     else 'no'))
+        labels = ['<= 0'] + ['{}-{}'.format(low, high - 1) for low, high in zip(self.GAP_EDGES, self.GAP_EDGES[1:])]
+        labels.append('{}+'.format(self.GAP_EDGES[-1]))
+        for label, bucket in zip(labels, buckets):
+            rows.append(('Gap working - committed ' + label, str(int(bucket))))
+        return rows
+
+    def __describe(self, title, sorted_revisions):
+        rows = [(title + ' min', str(int(sorted_revisions[0]))),
+                (title + ' max', str(int(sorted_revisions[-1])))]
+        for p in self.PERCENTILES:
+            rows.append(('{} p{}'.format(title, p), str(self.__percentile(sorted_revisions, p))))
+        return rows
+
+    @staticmethod
+    def __percentile(sorted_revisions, p):
+        """
+        Nearest-rank percentile
+        """
+        rank = max(1, -(-p * len(sorted_revisions) // 100))
+        return int(sorted_revisions[rank - 1])
+
+    def __flush(self):
+        if not self.__pending_working:
+            return
+        if self.use_numpy:
+            self.__working.append(numpy.array(self.__pending_working).astype(numpy.int64))
+            self.__committed.append(numpy.array(self.__pending_committed).astype(numpy.int64))
+        else:
+            self.__working.extend(map(int, self.__pending_working))
+            self.__committed.extend(map(int, self.__pending_committed))
+        self.__pending_working = []
+        self.__pending_committed = []
+
+
+def create_revision_columns():
+    """
+    :return: Columns that are needed to compute revision statistics
+    """
+    return [WorkingRevisionColumn(), CommittedRevisionColumn()]
+
+
+def revision_statistics(records, use_numpy=None):
+    """
+    :param records: Iterable of Record parsed with the columns returned by 'create_revision_columns'.
+    Only items of the working copy are used: externals can come from other repositories with unrelated revisions,
+    so items after the first external header are only counted as externals.
+    HEAD is taken from 'Status against revision' line of the working copy if there is one
+    :return: RevisionStatistics
+    """
+    statistics = RevisionStatistics(use_numpy)
+    for record in records:
+        if record.is_conflict_description:
+            continue
+        if record.line[:7] in ('Status ', b'Status ', 'Perform', b'Perform'):
+            line = record.line if isinstance(record.line, str) else record.line.decode('ascii', 'replace')
+            if EXTERNAL_HEADER.match(line) is not None:
+                statistics.externals += 1
+                continue
+            revision = STATUS_AGAINST_REVISION.match(line)
+            if revision is not None:
+                if not statistics.externals:
+                    statistics.head = int(revision.group(1))
+                continue
+        if not statistics.externals:
+            statistics.add(*record.values)
+    return statistics
+
+
+def render_statistics(rows, row_writer):
+    """
+    Writes pairs (title, value) as two-column table using specified row_writer
+    """
+    table = Table([Column(title='Statistic', width=40, alignment='<'), Column(title='Value', width=40, alignment='<')],
+                  left_separator='| ', right_separator=' |')
+    render((Record(None, list(row)) for row in rows), table, row_writer)
+
+
+class Reservoir:
+    """
+    Uniform random sample of fixed size from a stream of unknown length (Algorithm L).
+    Random numbers are drawn only for items that are taken, so skipping an item costs one comparison.
+    """
+
+    def __init__(self, size, rng=None):
+        """
+        :param size: Max number of items in sample
+        :param rng: random.Random. Default is a new generator seeded from system
+        """
+        self.size = size
+        self.items = []
+        self.count = 0  # number of items offered
+        self.__rng = random.Random() if rng is None else rng
+        self.__weight = 1.0
+        self.__next = 0  # index of the next item to take
+
+    def add(self, item):
+        index = self.count
+        self.count += 1
+        if index != self.__next:
+            return
+        if index < self.size:
+            self.items.append(item)
+            if index + 1 < self.size:
+                self.__next += 1
+                return
+        else:
+            self.items[self.__rng.randrange(self.size)] = item
+        self.__weight *= math.exp(math.log(self.__uniform()) / self.size)
+        self.__next = index + 1 + int(math.log(self.__uniform()) / math.log(1 - self.__weight))
+
+    def __uniform(self):
+        """
+        :return: Random number in (0, 1)
+        """
+        return self.__rng.random() or sys.float_info.min
+
+
+def sample_lines(lines_to_parse, size, stratified=False, rng=None):
+    """
+    Samples lines in one pass. Only the status flag is read, lines are not parsed.
+    Conflict descriptions are not sampled.
+    :param lines_to_parse: Iterable of lines of 'svn status -uv' output. Can be bytes
+    :param size: Sample size. If stratified, sample size for each status
+    :param stratified: Sample lines of each status separately, so rare statuses are not lost
+    :param rng: random.Random
+    :return: Tuple (sampled lines in input order, dict status flag -> [number of lines, number of sampled lines])
+    """
+    rng = random.Random() if rng is None else rng
+    totals = {}
+    reservoirs = {}
+    shared = Reservoir(size, rng)
+    for line_number, line in enumerate(lines_to_parse):
+        if line[6:7] in ('>', b'>') or line[:1] in ('-', b'-') or not line.strip():
+            continue  # conflict descriptions, changelist headers and blank lines
+        flag = line[:1]
+        totals[flag] = totals.get(flag, 0) + 1
+        if stratified:
+            reservoir = reservoirs.get(flag)
+            if reservoir is None:
+                reservoir = reservoirs[flag] = Reservoir(size, rng)
+            reservoir.add((line_number, line))
+        else:
+            shared.add((line_number, line))
+    items = [item for reservoir in reservoirs.values() for item in reservoir.items] if stratified else shared.items
+    items.sort(key=lambda item: item[0])
+    counts = {}
+    for flag, total in totals.items():
+        counts[flag.decode('latin-1') if isinstance(flag, bytes) else flag] = [total, 0]
+    for _, line in items:
+        flag = line[:1]
+        counts[flag.decode('latin-1') if isinstance(flag, bytes) else flag][1] += 1
+    return [line for _, line in items], counts
+
+
+def render_sample_counts(counts, row_writer):
+    """
+    Writes number of lines and sampled lines per status as text rows using specified row_writer
+    :param counts: Dict status flag -> [number of lines, number of sampled lines]. See 'sample_lines'
+    """
+    status_column = StatusColumn()
+    table = Table([Column(title='Status', width=20, alignment='<'), Column(title='Lines', width=12, alignment='>'),
+                   Column(title='Sampled', width=12, alignment='>')], left_separator='| ', right_separator=' |')
+    rows = [[status_column.build_value(flag), str(total), str(sampled)]
+            for flag, (total, sampled) in sorted(counts.items(), key=lambda item: -item[1][0])]
+    rows.append(['Total', str(sum(total for total, _ in counts.values())),
+                 str(sum(sampled for _, sampled in counts.values()))])
+    row_writer.write(table.build_header())
+    row_writer.write(table.build_header_separator())
+    for row in rows:
+        row_writer.write(table.format_row(row))
+        row_writer.write(table.build_row_separator())
+
+
+class SnapshotStore:
+
+    """
+    SQLite database of parsed 'svn status -uv' snapshots.
+    Tables:
+        snapshots(id, name, taken_at, source)
+        entries(snapshot_id, <name of every column, see 'create_columns'>)
+    View 'history' joins entries with snapshot name and time.
+    Values are stored in readable form, e.g. status is 'Conflicts' rather than 'C'.
+    """
+    BATCH_SIZE = 100000
+
+    def __init__(self, path):
+        """
+        :param path: Path to database. Created if it doesn't exist
+        """
+        self.column_names = [col.name for col in create_columns()]
+        self.connection = sqlite3.connect(path)
+        self.__create_schema()
+
+    def ingest(self, records, snapshot, taken_at=None, source=None, encoding='utf-8'):
+        """
+        Stores records as snapshot. Conflict descriptions are skipped. See 'ingest_rows'
+        :param records: Iterable of Record parsed with all columns, see 'create_columns'
+        :return: Number of stored records
+        """
+        rows = (record.values for record in records if record.values is not None)
+        return self.ingest_rows(rows, snapshot, taken_at, source, encoding)
+
+    def ingest_rows(self, rows, snapshot, taken_at=None, source=None, encoding='utf-8'):
+        """
+        Stores rows as snapshot in one transaction. Rows of snapshot with the same name are replaced.
+        Indexes are created after the first snapshot is loaded.
+        :param rows: Iterable of sequences of values of all columns, see 'create_columns' and 'parse_bytes_rows'
+        :param snapshot: Snapshot name
+        :param taken_at: ISO 8601 time of snapshot. Default is now
+        :param encoding: Encoding the records were parsed with. Values with undecodable bytes kept by
+        'surrogateescape' are stored as BLOB of the original bytes
+        :return: Number of stored rows
+        """
+        taken_at = datetime.datetime.now().isoformat(timespec='seconds') if taken_at is None else taken_at
+        count = 0
+        with self.connection:
+            self.connection.execute('DELETE FROM entries WHERE snapshot_id IN '
+                                    '(SELECT id FROM snapshots WHERE name = ?)', (snapshot,))
+            self.connection.execute('DELETE FROM snapshots WHERE name = ?', (snapshot,))
+            snapshot_id = self.connection.execute('INSERT INTO snapshots (name, taken_at, source) VALUES (?, ?, ?)',
+                                                  (snapshot, taken_at, source)).lastrowid
+            # snapshot id is a literal, so rows are bound as they are
+            insert = 'INSERT INTO entries (snapshot_id, {}) VALUES ({:d}, {})'.format(
+                ', '.join(self.column_names), snapshot_id, ', '.join('?' * len(self.column_names)))
+            rows = iter(rows)
+            while True:
+                batch = list(itertools.islice(rows, self.BATCH_SIZE))
+                if not batch:
+                    break
+                self.connection.execute('SAVEPOINT batch')
+                try:
+                    self.connection.executemany(insert, batch)
+                except UnicodeEncodeError:  # rare, so values are checked only in batches that fail
+                    self.connection.execute('ROLLBACK TO batch')
+                    self.connection.executemany(insert, (self.__encode_row(row, encoding) for row in batch))
+                self.connection.execute('RELEASE batch')
+                count += len(batch)
+            self.__create_indexes()
+        return count
+
+    def query(self, sql, parameters=()):
+        """
+        :return: Tuple (list of result column names, iterator of rows)
+        """
+        cursor = self.connection.execute(sql, parameters)
+        names = [] if cursor.description is None else [description[0] for description in cursor.description]
+        return names, cursor
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def __encode_row(row, encoding):
+        encoded = list(row)
+        for i, value in enumerate(row):
+            if isinstance(value, str):
+                try:
+                    value.encode('utf-8')
+                except UnicodeEncodeError:
+                    encoded[i] = value.encode(encoding, 'surrogateescape')
+        return encoded
+
+    def __create_schema(self):
+        with self.connection:
+            self.connection.execute('PRAGMA journal_mode = WAL')
+            self.connection.execute('PRAGMA synchronous = NORMAL')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS snapshots (id INTEGER PRIMARY KEY, '
+                                    'name TEXT UNIQUE NOT NULL, taken_at TEXT NOT NULL, source TEXT)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS entries (snapshot_id INTEGER NOT NULL '
+                                    'REFERENCES snapshots(id), {})'.format(
+                                        ', '.join('{} TEXT'.format(name) for name in self.column_names)))
+            self.connection.execute('CREATE VIEW IF NOT EXISTS history AS '
+                                    'SELECT snapshots.name AS snapshot, snapshots.taken_at, entries.* '
+                                    'FROM entries JOIN snapshots ON snapshots.id = entries.snapshot_id')
+
+    def __create_indexes(self):
+        """
+        Creates indexes if they don't exist. Building them once over loaded rows is faster than updating them
+        on each insert
+        """
+        self.connection.execute('CREATE INDEX IF NOT EXISTS entries_snapshot ON entries (snapshot_id)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS entries_path ON entries (path, snapshot_id)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS entries_status ON entries (status, snapshot_id)')
+
+
+def create_query_table(names, widths=()):
+    """
+    Creates table for query results. Results named after a column, e.g. 'path', are shown like that column.
+    :param names: Names of result columns
+    :param widths: Iterable of pairs (column index, width). See 'create_table'
+    """
+    known = {col.name: col for col in create_table(widths).columns}
+    columns = []
+    for name in names:
+        col = known.get(name)
+        columns.append(col if col is not None else Column(title=name, width=max(len(name), 10)))
+    return Table(columns, left_separator='| ', right_separator=' |')
+
+
+OUTPUT_FORMATS = ['table', 'json', 'html']
+
+
+def parse_encoding(text):
+    """
+    Checks that encoding is known to Python
+    :return: Encoding name as given
+    """
+    try:
+        codecs.lookup(text)
+    except LookupError:
+        raise argparse.ArgumentTypeError("unknown encoding: '{}'".format(text))
+    return text
+
+
+def parse_positive_int(text):
+    """
+    Parses integer that is greater than 0, e.g. number of worker processes
+    """
+    try:
+        value = int(text)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise argparse.ArgumentTypeError("invalid value: '{}'. Expected integer greater than 0".format(text))
+    return value
+
+
+def parse_non_negative_int(text):
+    """
+    Parses integer that is greater than or equal to 0, e.g. number of items to print
+    """
+    try:
+        value = int(text)
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise argparse.ArgumentTypeError("invalid value: '{}'. Expected integer greater than or equal to 0"
+                                         .format(text))
+    return value
+
+
+def parse_output_spec(text):
+    """
+    Parses 'FORMAT:PATH' string. See OUTPUT_FORMATS for the list of formats.
+    :return: Tuple (format, path)
+    """
+    output_format, sep, path = text.partition(':')
+    if not sep or output_format not in OUTPUT_FORMATS or not path:
+        raise argparse.ArgumentTypeError("invalid output: '{}'. Expected FORMAT:PATH where FORMAT is one of {}"
+                                         .format(text, ', '.join(OUTPUT_FORMATS)))
+    return output_format, path
+
+
+class SVNStatusTransformApp:
+    """
+    Main class
+    """
+    args = None
+    __parser = None
+
+    def __init__(self, argv=None):
+        """
+        :param argv: Command line arguments. Default is sys.argv[1:]
+        """
+        self.__parser = self.__create_parser()
+        self.args = self.__parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    def run(self):
+        """
+        :return: Exit code. 0 if output is closed by reader, e.g. by 'head'
+        """
+        try:
+            return self.__run()
+        except BrokenPipeError:
+            self.__discard_stdout()
+            return 0
+
+    def __run(self):
+        """
+        Runs the mode chosen by options
+        :return: Exit code
+        """
+        if self.args.hook and (self.args.serve is not None or self.args.query is not None or
+                               self.args.batch is not None or self.args.ingest is not None or
+                               self.args.rollup is not None or self.args.revision_stats or
+                               self.args.update_plan is not None or self.args.externals):
+            self.__parser.error('--hook can not be used with --serve, --query, --batch, --ingest, --rollup, '
+                                '--revision-stats, --update-plan or --externals')
+        if self.args.serve is not None:
+            return self.__serve()
+        if self.args.query is not None:
+            return self.__write_output(self.__print_query)
+        if not self.args.input_files:
+            self.__parser.error('the following arguments are required: input_file')
+        if self.args.batch is not None:
+            return self.__run_batch()
+        if self.args.ingest is not None:
+            return self.__ingest()
+        if len(self.args.input_files) > 1 and not self.args.merge:
+            self.__parser.error('several input files can be rendered only with --batch, --ingest or --merge')
+        if self.args.merge and self.args.range is not None:
+            self.__parser.error('--range can not be used with --merge')
+        if self.args.sorted and not self.args.merge:
+            self.__parser.error('--sorted can be used only with --merge')
+        if self.args.template is not None and (self.args.columns is not None or self.args.html is not None or
+                                               self.args.rollup is not None or self.args.revision_stats):
+            self.__parser.error('--template can not be used with --columns, --html, --rollup or --revision-stats')
+        if self.args.update_plan is not None and (self.args.columns is not None or self.args.template is not None or
+                                                  self.args.sample is not None or self.args.limit is not None or
+                                                  self.args.externals):
+            self.__parser.error('--update-plan can not be used with --columns, --template, --sample, --limit '
+                                'or --externals')
+        if self.args.sample is not None and (self.args.rollup is not None or self.args.revision_stats):
+            self.__parser.error('--sample can not be used with --rollup or --revision-stats')
+        if self.args.externals and (self.args.html is not None or self.args.tee or self.args.rollup is not None or
+                                    self.args.revision_stats or self.args.sample is not None):
+            self.__parser.error('--externals can not be used with --html, --tee, --rollup, --revision-stats '
+                                'or --sample')
+        if self.args.split_changelists is not None and (self.args.externals or self.args.rollup is not None or
+                                                        self.args.revision_stats or
+                                                        self.args.update_plan is not None or self.args.merge):
+            self.__parser.error('--split-changelists can not be used with --externals, --rollup, --revision-stats, '
+                                '--update-plan or --merge')
+        if self.args.limit is not None and (self.args.rollup is not None or self.args.revision_stats or
+                                            self.args.sample is not None or self.args.externals):
+            self.__parser.error('--limit can not be used with --rollup, --revision-stats, --sample or --externals')
+        if self.args.merge:
+            text_to_parse = self.__merge_inputs()
+        else:
+            text_to_parse = self.__read_input(self.args.input_files[0])
+        return self.__write_output(functools.partial(self.__print_report, text_to_parse))
+
+    def __merge_inputs(self):
+        """
+        Merges input files into one stream of lines without duplicate paths. Newer file wins.
+        Files are ordered by modification time, stdin is the newest.
+        With --sorted inputs are read all at once by streaming k-way merge, else one after another into memory
+        :return: Iterable of lines
+        """
+        if self.args.input_files.count('-') > 1:
+            self.__parser.error('stdin can be merged only once')
+        paths = sorted(self.args.input_files, key=lambda path: math.inf if path == '-' else self.__modified(path))
+        inputs = [group_items(self.__parse(self.__read_input(path), [WorkingCopyPathColumn()])) for path in paths]
+        return merge_sorted(inputs) if self.args.sorted else merge_unsorted(inputs)
+
+    def __modified(self, path):
+        try:
+            return os.path.getmtime(path)
+        except OSError as e:
+            self.__parser.error("can't open '{}': {}".format(path, e))
+
+    @staticmethod
+    def __discard_stdout():
+        """
+        Redirects stdout to devnull, so rows left in its buffer don't raise BrokenPipeError again at exit
+        """
+        try:
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            os.close(devnull)
+        except (OSError, ValueError, io.UnsupportedOperation):
+            pass
+
+    def __read_input(self, path, binary=None):
+        """
+        Opens input file. Applies --range
+        :param binary: Whether to read lines as bytes. Default is True if --encoding is given
+        :return: Iterable of lines
+        """
+        binary = self.args.encoding is not None if binary is None else binary
+        input_file = self.__open(functools.partial(open_input, binary=binary), path)
+        if binary and hasattr(sys.stdout, 'reconfigure'):
+            sys.stdout.reconfigure(errors='surrogateescape')  # undecodable bytes of paths are written back as is
+        if self.args.range is not None:
+            input_file = self.__read_range(path, input_file, *self.args.range)
+        if not self.args.progress:
+            return input_file
+        total_bytes = self.__input_size(path)
+        binary_file = input_file.buffer if total_bytes is not None and not binary else None
+        return ProgressReporter(total_bytes).wrap(input_file, binary_file)
+
+    def __input_size(self, path):
+        """
+        :return: Size of input file in bytes or None if it can't be used to estimate progress
+        """
+        if path == '-' or self.args.range is not None or not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as file:
+            if detect_compression(file) is not None:
+                return None
+        return os.path.getsize(path)
+
+    def __write_output(self, report):
+        """
+        Creates outputs, calls report and closes outputs
+        :param report: Callable (output, row_writer) -> exit code. Output is the file given by --output or None
+        :return: Exit code
+        """
+        output = None if self.args.output is None else self.__open(self.__open_output, self.args.output)
+        files = [] if output is None else [output]
+        try:
+            row_writer = self.__create_row_writer(output, files)
+            try:
+                return report(output, row_writer)
+            finally:
+                row_writer.close()
+        finally:
+            for file in files:
+                if file is not sys.stdout:
+                    file.close()
+
+    def __print_report(self, lines_to_parse, output, row_writer):
+        """
+        Prints table of items or the report chosen by options. Input that can't be read, e.g. truncated archive,
+        is reported as error
+        :return: Exit code
+        """
+        try:
+            return self.__print_chosen_report(lines_to_parse, output, row_writer)
+        except BrokenPipeError:
+            raise
+        except INPUT_ERRORS as e:
+            row_writer.flush()
+            print('Error while reading input: {}'.format(e))
+            return 1
+        finally:
+            self.__close_input(lines_to_parse)
+
+    @staticmethod
+    def __close_input(lines_to_parse):
+        """
+        Closes generator of input lines that may be partially read, so --progress prints its final report now
+        """
+        if inspect.isgenerator(lines_to_parse):
+            lines_to_parse.close()
+
+    def __print_chosen_report(self, lines_to_parse, output, row_writer):
+        """
+        :return: Exit code
+        """
+        if self.args.connect is not None and self.__is_plain_table() and self.args.encoding is None:
+            lines_to_parse = list(lines_to_parse)
+            exit_code = self.__render_via_daemon(lines_to_parse, output)
+            if exit_code is not None:
+                return exit_code
+        if self.args.update_plan is not None:
+            return self.__print_update_plan(lines_to_parse, row_writer)
+        if self.args.rollup is not None:
+            return self.__print_rollup(lines_to_parse, row_writer)
+        if self.args.revision_stats:
+            return self.__print_revision_statistics(lines_to_parse, row_writer)
+        selection = self.args.columns if self.args.template is None else self.args.template.names
+        table = compile_table(self.args.width, selection)
+        if self.args.sample is not None:
+            return self.__print_sample(table, lines_to_parse, row_writer)
+        if self.args.externals:
+            return self.__print_sections(table, lines_to_parse, row_writer)
+        return self.__print_table(table, lines_to_parse, row_writer)
+
+    def __is_plain_table(self):
+        """
+        :return: True if the only output is the text table of items
+        """
+        return self.args.rollup is None and not self.args.revision_stats and self.args.html is None \
+            and self.args.update_plan is None \
+            and not self.args.tee and self.args.template is None and self.args.sample is None \
+            and self.args.split_changelists is None \
+            and not self.args.externals and self.args.limit is None and not self.args.hook
+
+    def __create_row_writer(self, output, files):
+        """
+        Creates writer for main output and outputs given by --tee
+        :param output: File given by --output or None
+        :param files: List. Files opened for --tee outputs are appended to it
+        """
+        if self.args.html is not None:
+            row_writer = HtmlRowWriter(self.args.html, self.args.page_size)
+        else:
+            row_writer = ConsoleRowWriter() if output is None \
+                else FileRowWriter(output)
+            if self.args.template is not None:
+                row_writer = TemplateRowWriter(self.args.template, row_writer)
+        if self.args.tee or self.args.split_changelists is not None:
+            row_writer = TeeRowWriter(self.__create_tee_row_writers(row_writer, files))
+        return AsyncRowWriter(row_writer) if self.args.async_write else row_writer
+
+    def __create_tee_row_writers(self, row_writer, files):
+        """
+        :return: List of row_writer and writers of outputs given by --tee and --split-changelists
+        """
+        row_writers = [row_writer]
+        if self.args.split_changelists is not None:
+            row_writers.append(self.__create_changelist_row_writer(files))
+        for output_format, path in self.args.tee or []:
+            if output_format == 'html':
+                row_writers.append(HtmlRowWriter(path, self.args.page_size))
+                continue
+            file = self.__open(self.__open_output, path)
+            files.append(file)
+            row_writers.append(FileRowWriter(file) if output_format == 'table' else JsonRowWriter(file))
+        return row_writers
+
+    def __create_changelist_row_writer(self, files):
+        """
+        Creates writer of one table file per changelist in --split-changelists directory
+        :param files: List. Opened files are appended to it
+        """
+        directory = self.args.split_changelists
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            self.__parser.error("can't create '{}': {}".format(directory, e))
+        used_names = set()
+
+        def create_row_writer(changelist):
+            file = self.__open(self.__open_output,
+                               os.path.join(directory, changelist_file_name(changelist, used_names)))
+            files.append(file)
+            return FileRowWriter(file)
+
+        return ChangelistRowWriter(create_row_writer)
+
+    def __open(self, opener, path):
+        """
+        Opens file with specified opener. Reports an error in the same way argparse does.
+        """
+        try:
+            return opener(path)
+        except OSError as e:
+            self.__parser.error("can't open '{}': {}".format(path, e))
+
+    def __open_output(self, path):
+        """
+        Opens output file. Undecodable bytes of paths parsed with --encoding are written back as is
+        """
+        return open_output(path, errors=None if self.args.encoding is None else 'surrogateescape')
+
+    def __parse(self, lines_to_parse, columns):
+        """
+        Parse lines as text or as raw bytes if --encoding is given
+        :return: Generator of Record
+        """
+        if self.args.encoding is None:
+            return parse(lines_to_parse, columns)
+        return parse_bytes(lines_to_parse, columns, self.args.encoding)
+
+    def __ingest(self):
+        """
+        Stores each input file as a snapshot
+        :return: Exit code
+        """
+        if self.args.snapshot is not None and len(self.args.input_files) > 1:
+            self.__parser.error('--snapshot can be used only with one input file')
+        try:
+            store = SnapshotStore(self.args.ingest)
+        except sqlite3.Error as e:
+            self.__parser.error("can't open database '{}': {}".format(self.args.ingest, e))
+        try:
+            encoding = self.args.encoding or 'utf-8'
+            for path in self.args.input_files:
+                lines_to_parse = self.__read_input(path, binary=True)
+                taken_at = datetime.datetime.now() if path == '-' else \
+                    datetime.datetime.fromtimestamp(os.path.getmtime(path))
+                taken_at = taken_at.isoformat(timespec='seconds')
+                snapshot = self.args.snapshot or (taken_at if path == '-' else path)
+                started = time.perf_counter()
+                try:
+                    count = store.ingest_rows(parse_bytes_rows(lines_to_parse, encoding), snapshot, taken_at, path,
+                                              encoding)
+                except ParseException as e:
+                    print(format_parse_error(Table(create_columns()), e))
+                    return 1
+                except INPUT_ERRORS as e:
+                    print("Error while reading '{}': {}".format(path, e))
+                    return 1
+                finally:
+                    self.__close_input(lines_to_parse)
+                elapsed = time.perf_counter() - started
+                print("Ingested {} rows into snapshot '{}' in {:.3f} seconds ({:.0f} rows/s)".format(
+                    count, snapshot, elapsed, count / elapsed if elapsed > 0 else 0))
+        finally:
+            store.close()
+        return 0
+
+    def __print_query(self, output, row_writer):
+        """
+        Runs SQL query against snapshot database and prints results
+        :return: Exit code
+        """
+        database, sql = self.args.query
+        try:
+            store = SnapshotStore(database)
+        except sqlite3.Error as e:
+            self.__parser.error("can't open database '{}': {}".format(database, e))
+        try:
+            names, rows = store.query(sql)
+            table = create_query_table(names, self.args.width)
+            render((Record(None, [self.__query_value(value) for value in row]) for row in rows),
+                   table, row_writer, self.args.limit)
+        except sqlite3.Error as e:
+            row_writer.flush()
+            print('Query failed: {}'.format(e))
+            return 1
+        finally:
+            store.close()
+        return 0
+
+    def __query_value(self, value):
+        """
+        :return: Printable value of query result. BLOB values, e.g. paths with undecodable bytes, are decoded
+        with --encoding, undecodable bytes are escaped
+        """
+        if value is None:
+            return ''
+        if isinstance(value, bytes):
+            return value.decode(self.args.encoding or 'utf-8', 'backslashreplace')
+        return str(value)
+
+    def __render_via_daemon(self, lines_to_parse, output):
+        """
+        :return: Exit code or None if daemon is not running
+        """
+        try:
+            exit_code, text = request_render(self.args.connect, ''.join(lines_to_parse), self.args.width,
+                                             self.args.columns)
+        except OSError:
+            return None
+        (sys.stdout if output is None else output).write(text)
+        return exit_code
+
+    def __serve(self):
+        """
+        Serves render requests until interrupted
+        """
+        if self.args.input_files:
+            self.__parser.error('input files can not be used with --serve')
+        prebuilt = [((), None), (self.args.width, self.args.columns)]
+        try:
+            serve(self.args.serve, prebuilt)
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            self.__parser.error("can't serve on '{}': {}".format(self.args.serve, e))
+        return 0
+
+    def __run_batch(self):
+        """
+        Renders each input file into its own file in batch directory and prints the timing summary
+        """
+        if self.args.output is not None or self.args.range is not None:
+            self.__parser.error('--output and --range can not be used with --batch')
+        if self.args.html is not None or self.args.tee or self.args.limit is not None or \
+                self.args.sample is not None or self.args.rollup is not None or self.args.revision_stats or \
+                self.args.update_plan is not None or self.args.externals or self.args.merge or \
+                self.args.split_changelists is not None:
+            self.__parser.error('--html, --tee, --limit, --sample, --rollup, --revision-stats, --update-plan, '
+                                '--externals, --merge and --split-changelists can not be used with --batch')
+        if self.args.template is not None and self.args.columns is not None:
+            self.__parser.error('--template can not be used with --columns')
+        input_paths = expand_inputs(self.args.input_files)
+        output_paths = [batch_output_path(path, self.args.batch) for path in input_paths]
+        if len(set(output_paths)) != len(output_paths):
+            self.__parser.error('several input files have the same name. Their outputs would overwrite each other')
+
+        on_result = None
+        if self.args.progress:
+            sizes = {path: os.path.getsize(path) for path in input_paths if os.path.isfile(path)}
+            progress = ProgressReporter(sum(sizes.values()), check_every=1, unit='files')
+
+            def on_result(result):
+                progress.add(1, sizes.get(result.input_path, 0))
+
+        started = time.perf_counter()
+        template = self.args.template
+        selection = self.args.columns if template is None else template.names
+        results = render_batch(compile_table(self.args.width, selection), input_paths, self.args.batch,
+                               self.args.jobs, on_result, self.args.encoding, template)
+        elapsed = time.perf_counter() - started
+        if self.args.progress:
+            progress.finish()
+
+        summary = Table([Column(title='File', width=50, alignment='<'),
+                         Column(title='Lines', width=10, alignment='>'),
+                         Column(title='Seconds', width=10, alignment='>'),
+                         Column(title='Result', width=50, alignment='<')],
+                        left_separator='| ', right_separator=' |')
+        row_writer = ConsoleRowWriter()
+        row_writer.write(summary.build_header())
+        row_writer.write(summary.build_header_separator())
+        for result in results:
+            row_writer.write(summary.format_row([result.input_path, str(result.lines),
+                                                 '{:.3f}'.format(result.seconds),
+                                                 'OK' if result.error is None else result.error]))
+            row_writer.write(summary.build_row_separator())
+        failed = sum(1 for result in results if result.error is not None)
+        row_writer.write('{} files, {} failed, {:.3f} seconds'.format(len(results), failed, elapsed))
+        return 1 if failed else 0
+
+    def __create_parser(self):
+        argument_parser = argparse.ArgumentParser(description='''Script that transforms 'svn status -uv' 
+                                                                  output into readable table form''')
+        argument_parser.add_argument('input_files', nargs='*', metavar='input_file',
+                                     help="File with output of 'svn status -uv' command. "
+                                          "gzip, bz2 and xz files are decompressed on the fly. '-' means stdin. "
+                                          "Several files and glob patterns are allowed with --batch")
+        argument_parser.add_argument('-o', '--output',
+                                     help="File to write script output. "
+                                          "Output is compressed if file name ends with '.gz', '.bz2' or '.xz'")
+        argument_parser.add_argument('-e', '--encoding', type=parse_encoding, metavar='ENCODING',
+                                     help='Parse input as raw bytes and decode only paths and authors with ENCODING. '
+                                          'Undecodable bytes are kept as is. Use it for dumps with paths in legacy '
+                                          'or mixed encodings')
+        argument_parser.add_argument('-t', '--tee', type=parse_output_spec, action='append', default=[],
+                                     metavar='FORMAT:PATH',
+                                     help='Also write output to PATH. Can be repeated. Each line is parsed once '
+                                          'for all outputs. FORMAT is one of: {}. '
+                                          "For 'html' PATH is a directory".format(', '.join(OUTPUT_FORMATS)))
+        argument_parser.add_argument('--html', metavar='DIR',
+                                     help="Write output as HTML pages to DIR instead of text. "
+                                          "Open 'DIR/index.html' to browse them")
+        argument_parser.add_argument('--page-size', type=int, default=HtmlRowWriter.PAGE_SIZE, metavar='ROWS',
+                                     help='Number of rows per HTML page. Default is %(default)s')
+        argument_parser.add_argument('-w', '--width', type=int, nargs=2, action='append',
+                                     metavar=('INDEX', 'WIDTH'), default=[],
+                                     help='Set column width. Column index is 0-based')
+        argument_parser.add_argument('-c', '--columns', type=parse_column_selection, metavar='COLUMNS',
+                                     help='Comma-separated names or 0-based indexes of columns to show, '
+                                          "e.g. 'status,out_of_date,path'. Columns that are not shown are not parsed")
+        argument_parser.add_argument('-r', '--range', type=parse_line_range, metavar='START:END',
+                                     help='Render only lines [START, END) of input. Line numbers are 0-based. '
+                                          'Uses a sidecar line index that is built on first use')
+        argument_parser.add_argument('--index-file', metavar='PATH',
+                                     help="Sidecar line index to use with --range. Default is '<input_file>.idx'")
+        argument_parser.add_argument('-b', '--batch', metavar='OUTPUT_DIR',
+                                     help='Render each input file in parallel into its own file in OUTPUT_DIR')
+        argument_parser.add_argument('-j', '--jobs', type=parse_positive_int, metavar='N',
+                                     help='Number of worker processes for --batch and --externals. '
+                                          'Default is the number of CPUs')
+        argument_parser.add_argument('--serve', metavar='SOCKET',
+                                     help='Run as daemon serving render requests on Unix socket. '
+                                          'Tables for default widths and widths given by -w are built in advance')
+        argument_parser.add_argument('--connect', metavar='SOCKET',
+                                     help='Render via daemon listening on Unix socket. '
+                                          'Falls back to rendering in process if daemon is not running')
+        argument_parser.add_argument('--ingest', metavar='DATABASE',
+                                     help='Instead of printing store parsed input files into SQLite DATABASE. '
+                                          'Each file becomes a snapshot named after the file')
+        argument_parser.add_argument('--snapshot', metavar='NAME',
+                                     help='Snapshot name for --ingest. Snapshot with the same name is replaced')
+        argument_parser.add_argument('--query', nargs=2, metavar=('DATABASE', 'SQL'),
+                                     help="Run SQL query against DATABASE filled by --ingest and print the result. "
+                                          "Tables: 'snapshots', 'entries'; view 'history' has snapshot name "
+                                          "and time for each entry")
+        argument_parser.add_argument('--rollup', type=parse_non_negative_int, metavar='DEPTH',
+                                     help='Instead of table of items print counts of modified, conflicted, '
+                                          'out of date and not controlled items per directory down to DEPTH')
+        argument_parser.add_argument('--update-plan', type=float, nargs='?', const=UpdatePlanner.THRESHOLD,
+                                     metavar='THRESHOLD',
+                                     help="Instead of table of items print the smallest set of paths to pass to "
+                                          "'svn update', one per line, so that all out of date items are updated. "
+                                          "Directory is updated as a whole when THRESHOLD share of its entries "
+                                          "would be updated as a whole. Default is %(const)s")
+        argument_parser.add_argument('--revision-stats', action='store_true',
+                                     help='Instead of table of items print statistics of working and committed '
+                                          'revisions: percentiles, mixed revisions and histogram of gaps. '
+                                          'Items of externals are not included')
+        argument_parser.add_argument('--template', type=parse_template, metavar='TEMPLATE',
+                                     help="Print one line per item formatted with TEMPLATE instead of table, "
+                                          "e.g. '{status:1} {out_of_date:1} {path}'. Fields are column names, "
+                                          "format spec is the same as in Python str.format, bare width crops "
+                                          "value. Only columns used in TEMPLATE are parsed. "
+                                          "--tee outputs get the table of these columns")
+        argument_parser.add_argument('--split-changelists', metavar='DIR',
+                                     help="Also write items of each changelist to its own table file in DIR, "
+                                          "e.g. 'DIR/release.txt'. Items without changelist are written to "
+                                          "'DIR/no-changelist.txt'")
+        argument_parser.add_argument('--merge', action='store_true',
+                                     help='Merge several input files into one table. Items with the same path are '
+                                          'printed once, from the most recently modified file. Changelist headers '
+                                          'are not merged, so items lose their changelists')
+        argument_parser.add_argument('--sorted', action='store_true',
+                                     help='Input files of --merge are sorted by path. They are merged in one '
+                                          'streaming pass holding one item per file instead of all items. '
+                                          'Fails on the first item that is out of order')
+        argument_parser.add_argument('--externals', action='store_true',
+                                     help="Split input into the working copy and externals by 'Performing status "
+                                          "on external item' headers. Each part is rendered as its own table with "
+                                          "summary, parts are rendered in parallel")
+        argument_parser.add_argument('--sample', type=parse_positive_int, metavar='N',
+                                     help='Print N randomly chosen items instead of all items, then the number of '
+                                          'items per status. Only the chosen items are parsed')
+        argument_parser.add_argument('--stratify', action='store_true',
+                                     help='With --sample choose N items of each status')
+        argument_parser.add_argument('--seed', type=int,
+                                     help='Seed of random generator for --sample. Makes the sample reproducible')
+        argument_parser.add_argument('--hook', action='append', type=parse_hook, metavar='MODULE:CLASS',
+                                     help="Pass parsed items to custom check, subclass of status.RecordHook, "
+                                          "e.g. 'checks.py:NoLockedInRelease'. Hooks can drop, annotate and count "
+                                          "items. Can be repeated. Hook statistics are printed to stderr")
+        argument_parser.add_argument('--limit', type=parse_non_negative_int, metavar='N',
+                                     help='Print only the first N items. Input after them is not read')
+        argument_parser.add_argument('--async-write', action='store_true',
+                                     help='Write output in a background thread, so reading and parsing are not '
+                                          'blocked by slow output, e.g. network drive or pipe')
+        argument_parser.add_argument('--progress', action='store_true',
+                                     help='Print bytes and lines processed, throughput and ETA to stderr. '
+                                          'With --batch the progress is counted in files')
+
+        return argument_parser
+
+    def __read_range(self, path, input_file, start, end):
+        """
+        Reads lines [start, end) of input file.
+        Seeks directly to the first line via the sidecar index if input is a regular uncompressed file.
+        """
+        binary = self.args.encoding is not None
+        buffer = input_file if binary else input_file.buffer
+        if path == '-' or not os.path.isfile(path) or not isinstance(buffer, io.BufferedReader):
+            return itertools.islice(input_file, start, end)
+        input_file.close()
+        index = LineIndex(path, self.args.index_file).update()
+        return index.read_lines(start, end, encoding=None if binary else input_file.encoding, binary=binary)
+
+    def __print_table(self, table, lines_to_parse, row_writer):
+        """
+        Parse lines and prints them using specified row_writer
+        :param lines_to_parse: 'svn status -uv' output
+        :param row_writer: Element of class 'RowWriter'
+        :return: Exit code
+        """
+        hooks = self.args.hook or []
+        columns = hook_columns(table.columns, hooks)
+        records = self.__parse(lines_to_parse, columns)
+        pipeline = None
+        if hooks:
+            pipeline = HookPipeline(hooks, columns)
+            records = pipeline.apply(records, keep=table.cols_count)
+            if pipeline.annotates:
+                notes = Column(title='Notes', width=40, alignment='<')
+                table = TableSpec(table.columns + (notes,), table.widths + (notes.width,),
+                                  table.column_separator, table.left_separator, table.right_separator,
+                                  table.header_separator, table.row_separator)
+        try:
+            render(records, table, row_writer, self.args.limit)
+        except ParseException as e:
+            row_writer.flush()
+            print(format_parse_error(table, e))
+            return 1
+        finally:
+            if pipeline is not None:
+                render_hook_statistics(pipeline, FileRowWriter(sys.stderr))
+        return 0
+
+    def __print_sections(self, table, lines_to_parse, row_writer):
+        """
+        Prints table and summary of the working copy and of each external. Sections are rendered in parallel
+        :return: Exit code
+        """
+        encoding = self.args.encoding or 'utf-8'
+        sections = split_sections(lines_to_parse, encoding)
+        template = self.args.template
+        if self.args.jobs == 1:
+            results = (render_section(section, table, template, encoding) for section in sections)
+        else:
+            results = render_sections(sections, table, template, self.args.jobs, encoding)
+        exit_code = 0
+        for result in results:
+            row_writer.write(result.title)
+            row_writer.write(result.text.rstrip('\n'))
+            if result.error is not None:
+                row_writer.write(result.error)
+                exit_code = 1
+            row_writer.write(result.summary)
+            row_writer.write('')
+        return exit_code
+
+    def __print_sample(self, table, lines_to_parse, row_writer):
+        """
+        Prints random sample of lines and the number of lines per status
+        :return: Exit code
+        """
+        rng = random.Random(self.args.seed)
+        sample, counts = sample_lines(lines_to_parse, self.args.sample, self.args.stratify, rng)
+        exit_code = self.__print_table(table, sample, row_writer)
+        if exit_code == 0:
+            render_sample_counts(counts, row_writer)
+        return exit_code
+
+    def __print_update_plan(self, lines_to_parse, row_writer):
+        """
+        Prints paths to pass to 'svn update', one per line
+        :return: Exit code
+        """
+        columns = create_update_plan_columns()
+        try:
+            targets = plan_update(self.__parse(lines_to_parse, columns), self.args.update_plan)
+        except ParseException as e:
+            print(format_parse_error(Table(columns), e))
+            return 1
+        for path in targets:
+            row_writer.write(path)
+        return 0
+
+    def __print_rollup(self, lines_to_parse, row_writer):
+        """
+        Prints counters per directory
+        :return: Exit code
+        """
+        columns = create_rollup_columns()
+        try:
+            trie = rollup(self.__parse(lines_to_parse, columns), self.args.rollup)
+        except ParseException as e:
+            print(format_parse_error(Table(columns), e))
+            return 1
+        render_rollup(trie, row_writer)
+        return 0
+
+    def __print_revision_statistics(self, lines_to_parse, row_writer):
+        """
+        Prints statistics of revisions
+        :return: Exit code
+        """
+        columns = create_revision_columns()
+        try:
+            statistics = revision_statistics(self.__parse(lines_to_parse, columns))
+        except ParseException as e:
+            print(format_parse_error(Table(columns), e))
+            return 1
+        render_statistics(statistics.rows(), row_writer)
+        return 0
 
 
 if __name__ == '__main__':
+    sys.modules.setdefault('status', sys.modules[__name__])  # hooks importing 'status' get this module
     app = SVNStatusTransformApp()
-    app.run()
+    sys.exit(app.run())
@@ -1,3 +1,13 @@
+import contextlib
+import io
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
 import status
 
@@ -423,6 +433,16 @@ class TestWorkingCopyPathColumn(unittest.TestCase):
         with self.assertRaises(status.ParseException, msg='missed columns'):
             self.col.build_value(r'AML+SKC *    58416    48101 goncharov    ')
 
+    def test_build_4(self):
+        actual = self.col.build_value(r'AML+SKC *    58416    48101 5    dir 5\file5.c')
+        self.assertEqual(r'dir 5\file5.c', actual)
+
+    def test_build_added_on_server(self):
+        line = '        *                                  trunk/new file.c'
+        self.assertEqual('trunk/new file.c', self.col.build_value(line))
+        self.assertEqual('', status.WorkingRevisionColumn().build_value(line))
+        self.assertEqual('', status.CommittedAuthorColumn().build_value(line))
+
 
 class TestTable(unittest.TestCase):
 
@@ -551,6 +571,1185 @@ class TestTable(unittest.TestCase):
         with self.assertRaises(status.ParseException, msg='missed columns'):
             table.build_row(line)
 
+    def test_format_row(self):
+        table = status.Table([status.Column(title='col1', alignment='<', width=4),
+                              status.Column(title='col2', alignment='<', width=4)],
+                             column_separator='|', left_separator='', right_separator='')
+        actual = table.format_row(['abcdef', 'x'])
+        expected = 'abcd|x   \nef  |    '
+        self.assertEqual(expected, actual)
+
+
+class TestColumnSelection(unittest.TestCase):
+
+    def test_select_columns(self):
+        columns = status.create_columns()
+        selected = status.select_columns(['path', 0, 'out_of_date'], columns)
+        self.assertEqual([columns[11], columns[0], columns[7]], selected)
+
+    def test_select_columns_incorrect(self):
+        with self.assertRaises(ValueError):
+            status.select_columns([12], status.create_columns())
+        with self.assertRaises(ValueError):
+            status.select_columns(['unknown'], status.create_columns())
+
+    def test_parse_column_selection(self):
+        self.assertEqual(['status', 7, 'path'], status.parse_column_selection('status, 7,path'))
+        with self.assertRaises(status.argparse.ArgumentTypeError):
+            status.parse_column_selection('status,unknown')
+
+    def test_create_table(self):
+        table = status.create_table([[11, 20], [0, 3]], ['status', 'path'])
+        self.assertEqual(['Status', 'Working copy path'], [col.title for col in table.columns])
+        self.assertEqual([3, 20], [col.width for col in table.columns])
+        line = r'AML+SKC *    58416    48101 goncharov    _cntl\win32\altpubserv.vcproj'
+        self.assertEqual('| Add | _cntl\\win32\\altpubse |\n| ed  | rv.vcproj            |', table.build_row(line))
+
+
+class TestLibraryApi(unittest.TestCase):
+    lines = [
+        'M       *    58416    48101 goncharov    a/b.c\n',
+        '      >   local edit, incoming delete upon update\n',
+        '?                                        svn.txt\n'
+    ]
+
+    def test_parse_1(self):
+        records = list(status.parse(self.lines))
+        self.assertEqual(['Modified', ' ', ' ', ' ', ' ', ' ', ' ', 'Out of date', '58416', '48101', 'goncharov',
+                          'a/b.c'], records[0].values)
+        self.assertTrue(records[1].is_conflict_description)
+        self.assertEqual('svn.txt', records[2].values[-1])
+
+    def test_parse_2(self):
+        records = status.parse(self.lines, [status.WorkingCopyPathColumn()])
+        self.assertEqual(['a/b.c'], next(records).values)
+
+    def test_parse_incorrect_1(self):
+        with self.assertRaises(status.ParseException) as context:
+            list(status.parse(self.lines + ['AML+SKC *  \n']))
+        self.assertEqual(4, context.exception.line_number)
+        self.assertEqual('AML+SKC *  \n', context.exception.line)
+
+    def test_render(self):
+        table = status.Table([status.StatusColumn(alignment='<', width=8), status.WorkingCopyPathColumn(width=7)],
+                             column_separator='|', left_separator='', right_separator='', row_separator='-')
+        output = status.io.StringIO()
+        count = status.render(status.parse(self.lines, table.columns), table, status.FileRowWriter(output))
+        expected = ['Status  |Working',
+                    '        | copy p',
+                    '        |ath    ',
+                    '================',
+                    'Modified|a/b.c  ',
+                    '----------------',
+                    '      >   local edit, incoming delete upon update',
+                    '----------------',
+                    'Not cont|svn.txt',
+                    'rolled  |       ',
+                    '----------------']
+        self.assertEqual(3, count)
+        self.assertEqual(expected, output.getvalue().splitlines())
+
+    def test_app(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'dump.txt')
+            output_path = os.path.join(directory, 'table.txt')
+            with open(input_path, 'w') as input_file:
+                input_file.writelines(self.lines)
+            app = status.SVNStatusTransformApp([input_path, '-o', output_path])
+            self.assertEqual(0, app.run())
+            with open(output_path) as output:
+                self.assertIn('a/b.c', output.read())
+
+    def test_parse_non_negative_int(self):
+        self.assertEqual(0, status.parse_non_negative_int('0'))
+        for text in ['-1', 'x']:
+            with self.assertRaises(status.argparse.ArgumentTypeError):
+                status.parse_non_negative_int(text)
+
+    def test_render_limit(self):
+        read = []
+
+        def lines():
+            for line in self.lines * 100:
+                read.append(line)
+                yield line
+
+        output = status.io.StringIO()
+        table = status.compile_table(selection=['path'])
+        count = status.render(status.parse(lines(), table.columns), table, status.FileRowWriter(output), limit=2)
+        self.assertEqual(2, count)
+        self.assertEqual(2, len(read))
+
+    def test_app_broken_pipe(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'dump.txt')
+            with open(input_path, 'w') as input_file:
+                input_file.writelines(self.lines * 5000)
+            process = subprocess.Popen([sys.executable, status.__file__, input_path],
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            process.stdout.readline()
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            self.assertEqual(0, process.wait())
+            self.assertEqual(b'', stderr)
+
+
+@unittest.skipUnless(hasattr(status.socket, 'AF_UNIX'), 'Unix sockets are not supported')
+class TestDaemon(unittest.TestCase):
+    text = 'M       *    58416    48101 goncharov    a/b.c\n'
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.directory.name, 'status.sock')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_table_cache(self):
+        cache = status.TableCache([((), None), ([[0, 10]], None)])
+        self.assertIs(cache.get([]), cache.get(()))
+        self.assertIs(cache.get([[0, 10]]), cache.get(((0, 10),)))
+        self.assertEqual(10, cache.get([[0, 10]]).columns[0].width)
+
+    def test_table_cache_last_width_wins(self):
+        cache = status.TableCache()
+        self.assertEqual(status.compile_table([[0, 20], [0, 5]]).widths, cache.get([[0, 20], [0, 5]]).widths)
+        self.assertEqual(5, cache.get([[0, 20], [0, 5]]).columns[0].width)
+
+    def test_request_render(self):
+        server = status.create_server(self.socket_path)
+        thread = status.threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            exit_code, text = status.request_render(self.socket_path, self.text, [[0, 10]])
+            self.assertEqual(0, exit_code)
+            self.assertEqual(status.create_table([[0, 10]]).build_row(self.text), text.splitlines()[2])
+            exit_code, text = status.request_render(self.socket_path, 'AML+SKC *  \n')
+            self.assertEqual(1, exit_code)
+            self.assertIn('Error while parsing line', text)
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+    def test_request_render_not_running(self):
+        with self.assertRaises(OSError):
+            status.request_render(self.socket_path, self.text)
+
+    def test_create_server_keeps_regular_file(self):
+        with open(self.socket_path, 'w') as file:
+            file.write('precious')
+        with self.assertRaisesRegex(OSError, 'not a socket'):
+            status.create_server(self.socket_path)
+        with open(self.socket_path) as file:
+            self.assertEqual('precious', file.read())
+
+
+class TestRollup(unittest.TestCase):
+    lines = [
+        'M       *    58416    48101 goncharov    a\\b\\c.c\n',
+        '?                                        a/svn.txt\n',
+        'C            58416    48101 ivanov    x/y/z/d.c\n',
+        '        *    58416    48101 ivanov    .\n'
+    ]
+
+    def test_split_path(self):
+        self.assertEqual(['a', 'b', 'c.c'], status.PathTrie.split_path(r'.\a/b\c.c'))
+
+    def test_rollup_1(self):
+        trie = status.rollup(status.parse(self.lines, status.create_rollup_columns()), 2)
+        actual = [(path, list(counts)) for path, counts in trie.rows()]
+        expected = [('.', [4, 1, 1, 2, 1]),
+                    ('a', [2, 1, 0, 1, 1]),
+                    ('a/b', [1, 1, 0, 1, 0]),
+                    ('x', [1, 0, 1, 0, 0]),
+                    ('x/y', [1, 0, 1, 0, 0])]
+        self.assertEqual(expected, actual)
+
+    def test_render_rollup_wide_counts(self):
+        trie = status.PathTrie(0, len(status.ROLLUP_COUNTERS))
+        trie.add('a.c', (149540, 0, 0, 0, 0))
+        output = io.StringIO()
+        status.render_rollup(trie, status.FileRowWriter(output))
+        self.assertEqual(4, len(output.getvalue().splitlines()))
+        self.assertIn('| 149540 |', output.getvalue())
+
+    def test_rollup_2(self):
+        trie = status.rollup(status.parse(self.lines, status.create_rollup_columns()), 0)
+        self.assertEqual([('.', [4, 1, 1, 2, 1])], [(path, list(counts)) for path, counts in trie.rows()])
+
+
+class TestUpdatePlan(unittest.TestCase):
+    items = [('src/a/x.c', True), ('src/a/y.c', False), ('src/b/1.c', True), ('src/b/2.c', True),
+             ('src/b/3.c', True), ('src/b/4.c', False), ('src/c/z.c', True), ('src/c/w.c', False),
+             ('src/c/v.c', False), ('src/d.c', False), ('src/a', False), ('src/b', False), ('src/c', False),
+             ('src', False), ('.', False)]
+
+    def plan(self, threshold, items=None):
+        planner = status.UpdatePlanner(threshold)
+        for path, out_of_date in self.items if items is None else items:
+            planner.add(path, out_of_date)
+        return planner.targets()
+
+    def test_threshold(self):
+        self.assertEqual(['.'], self.plan(0))
+        self.assertEqual(['.'], self.plan(0.5))
+        self.assertEqual(['src/a/x.c', 'src/b', 'src/c/z.c'], self.plan(0.7))
+        self.assertEqual(['src/a/x.c', 'src/b/1.c', 'src/b/2.c', 'src/b/3.c', 'src/c/z.c'], self.plan(1))
+
+    def test_out_of_date_directory(self):
+        self.assertEqual(['src/a'], self.plan(1, [('src/a/x.c', True), ('src/a', True), ('src/b', False)]))
+
+    def test_nothing_out_of_date(self):
+        self.assertEqual([], self.plan(0, [('src/a/x.c', False)]))
+
+    def test_plan_update(self):
+        lines = ['        *    58416    48101 goncharov    src\\a.c\n',
+                 '             58416    48101 goncharov    src\\b.c\n',
+                 '?                                        src\\c.c\n']
+        records = status.parse(lines, status.create_update_plan_columns())
+        self.assertEqual(['src/a.c'], status.plan_update(records, 0.5))
+
+    def test_update_plan_options(self):
+        for options in [['--limit', '0'], ['--sample', '1'], ['--template', '{path}'], ['--columns', 'path'],
+                        ['--externals']]:
+            app = status.SVNStatusTransformApp(['input.txt', '--update-plan'] + options)
+            with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+                app.run()
+
+    def test_plan_update_added_on_server(self):
+        lines = ['        *                                  src/new.c\n',
+                 '             58416    48101 goncharov    src/b.c\n']
+        records = status.parse(lines, status.create_update_plan_columns())
+        self.assertEqual(['src/new.c'], status.plan_update(records, 0.6))
+
+
+class TestRevisionStatistics(unittest.TestCase):
+    lines = [
+        'M       *    58416    48101 goncharov    a/b.c\n',
+        'A            -    48101 goncharov    a/b.c\n',
+        '?                                        a/svn.txt\n',
+        'C            58400    58400 ivanov    x/y/z/d.c\n',
+        '        *    58416    12    ivanov    .\n'
+    ]
+
+    def statistics(self, use_numpy):
+        records = status.parse(self.lines, status.create_revision_columns())
+        return dict(status.revision_statistics(records, use_numpy).rows())
+
+    def check(self, use_numpy):
+        rows = self.statistics(use_numpy)
+        self.assertEqual('3', rows['Items with revisions'])
+        self.assertEqual('58416', rows['HEAD (max revision seen)'])
+        self.assertEqual('58400', rows['Working revision min'])
+        self.assertEqual('48101', rows['Committed revision p50'])
+        self.assertEqual('16', rows['Behind HEAD max'])
+        self.assertEqual('1', rows['Items behind HEAD'])
+        self.assertEqual('yes (2 distinct working revisions)', rows['Mixed revisions'])
+        self.assertEqual('1', rows['Gap working - committed <= 0'])
+        self.assertEqual('2', rows['Gap working - committed 10000-99999'])
+
+    def test_array(self):
+        self.check(use_numpy=False)
+
+    def test_status_against_revision(self):
+        lines = ['        *      100       90 alice    a.c\n',
+                 'M              100       95 bob      b.c\n',
+                 'Status against revision:    500\n']
+        for use_numpy in [False] + ([] if status.import_numpy() is None else [True]):
+            records = status.parse(lines, status.create_revision_columns())
+            rows = dict(status.revision_statistics(records, use_numpy).rows())
+            self.assertEqual('2', rows['Items with revisions'])
+            self.assertEqual('500', rows['HEAD (status against revision)'])
+            self.assertEqual('400', rows['Behind HEAD min'])
+            self.assertEqual('2', rows['Items behind HEAD'])
+        records = status.parse_bytes([line.encode() for line in lines], status.create_revision_columns())
+        rows = dict(status.revision_statistics(records, False).rows())
+        self.assertEqual('500', rows['HEAD (status against revision)'])
+
+    def test_externals_not_included(self):
+        lines = ['M              120      100 alice    a.c\n',
+                 'Status against revision:    140\n',
+                 '\n',
+                 "Performing status on external item at 'ext':\n",
+                 'M              130      100 bob      ext/b.c\n',
+                 'Status against revision:    150\n']
+        rows = dict(status.revision_statistics(status.parse(lines, status.create_revision_columns()), False).rows())
+        self.assertEqual('1', rows['Items with revisions'])
+        self.assertEqual('140', rows['HEAD (status against revision)'])
+        self.assertEqual('20', rows['Behind HEAD max'])
+        self.assertEqual('1', rows['Externals (not included)'])
+
+    @unittest.skipIf(status.import_numpy() is None, 'NumPy is not installed')
+    def test_numpy(self):
+        self.check(use_numpy=True)
+
+    def test_batches(self):
+        statistics = status.RevisionStatistics(use_numpy=False)
+        statistics.BATCH_SIZE = 2
+        for revision in range(1, 6):
+            statistics.add(str(revision), str(revision))
+        rows = dict(statistics.rows())
+        self.assertEqual('5', rows['Items with revisions'])
+        self.assertEqual('3', rows['Working revision p50'])
+        self.assertEqual('yes (5 distinct working revisions)', rows['Mixed revisions'])
+
+    def test_empty(self):
+        self.assertEqual([('Items with revisions', '0')], status.RevisionStatistics(use_numpy=False).rows())
+
+
+class TestHtmlRowWriter(unittest.TestCase):
+    lines = [
+        'M       *    58416    48101 goncharov    a/<b>.c\n',
+        '      >   local edit, incoming delete upon update\n',
+        '?                                        svn.txt\n'
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.directory.name, name), encoding='utf-8') as file:
+            return file.read()
+
+    def test_pages(self):
+        table = status.create_table()
+        row_writer = status.HtmlRowWriter(self.directory.name, page_size=2)
+        status.render(status.parse(self.lines, table.columns), table, row_writer)
+        row_writer.close()
+        self.assertEqual(['index.html', 'page-00001.html', 'page-00002.html', 'style.css'],
+                         sorted(os.listdir(self.directory.name)))
+        first_page = self.read('page-00001.html')
+        self.assertIn('<th>Working copy path</th>', first_page)
+        self.assertIn('<td class="status-modified">Modified</td>', first_page)
+        self.assertIn('<td>a/&lt;b&gt;.c</td>', first_page)
+        self.assertIn('local edit, incoming delete upon update</pre>', first_page)
+        self.assertIn('<td class="status-not-controlled">Not controlled</td>', self.read('page-00002.html'))
+        self.assertIn('rows 3-3', self.read('index.html'))
+        self.assertIn('.status-modified', self.read('style.css'))
+
+    def test_css_name(self):
+        self.assertEqual('out-of-date', status.HtmlRowWriter.css_name('Out of date'))
+
+
+class TestBytesParsing(unittest.TestCase):
+    lines = [
+        r'MML+SKC *    58416    48101 goncharov    _cntl\win32\altpubserv.vcproj' + '\n',
+        r' C  S  *    58416    48101 goncharov    path with spaces.txt' + '\n',
+        r'!                -    48101 goncharov    _cntl\win32\altpubserv.vcproj' + '\n',
+        r'?                                        svn.txt' + '\n',
+        r'I                                        svn.txt' + '\n',
+        '        *                                  trunk/new.c\n',
+        '      >   local edit, incoming delete upon update\n'
+    ]
+
+    def test_same_as_text(self):
+        expected = [(record.line, record.values) for record in status.parse(self.lines)]
+        actual = [(record.line if record.values is None else record.line.decode(), record.values)
+                  for record in status.parse_bytes([line.encode() for line in self.lines])]
+        self.assertEqual(expected, actual)
+
+    def test_rows_same_as_records(self):
+        lines = [line.encode() for line in self.lines] + [
+            b"--- Changelist 'a b c d':\n", b'\n', b'A  +    *     -        ?   ?          a\xffb.txt\n',
+            b'M            58416    48101 \xd0\xb8 a b\n']
+        expected = [tuple(record.values) for record in status.parse_bytes(lines) if record.values is not None]
+        self.assertEqual(expected, list(status.parse_bytes_rows(lines)))
+
+    def test_rows_incorrect(self):
+        with self.assertRaises(status.ParseException) as context:
+            list(status.parse_bytes_rows([b'M            58416    48101 ivanov    a.c\n',
+                                          b'AML+SKC *    58416    48101 goncharov    \n']))
+        self.assertEqual(2, context.exception.line_number)
+        self.assertEqual('AML+SKC *    58416    48101 goncharov    \n', context.exception.line)
+
+    def test_legacy_encoding(self):
+        line = 'M            58416    48101 иванов    путь/файл.txt\n'.encode('cp1251')
+        record = next(status.parse_bytes([line], encoding='cp1251'))
+        self.assertEqual('иванов', record.values[10])
+        self.assertEqual('путь/файл.txt', record.values[11])
+
+    def test_undecodable(self):
+        record = next(status.parse_bytes([b'?                                        \xff.txt\n']))
+        self.assertEqual('\udcff.txt', record.values[11])
+        self.assertEqual(b'\xff.txt', record.values[11].encode('utf-8', 'surrogateescape'))
+
+    def test_parse_encoding(self):
+        self.assertEqual('cp1251', status.parse_encoding('cp1251'))
+        with self.assertRaises(status.argparse.ArgumentTypeError):
+            status.parse_encoding('nosuchenc')
+
+    def test_incorrect_1(self):
+        with self.assertRaises(status.ParseException) as context:
+            list(status.parse_bytes([b'AML+SKC *    58416    48101 goncharov    \n']))
+        self.assertEqual('AML+SKC *    58416    48101 goncharov    \n', context.exception.line)
+
+    def test_incorrect_2(self):
+        with self.assertRaises(status.ParseException):
+            list(status.parse_bytes([b'']))
+
+
+class TestTeeRowWriter(unittest.TestCase):
+    lines = [
+        'M       *    58416    48101 goncharov    a/b.c\n',
+        '      >   local edit, incoming delete upon update\n'
+    ]
+
+    def test_tee(self):
+        table = status.Table([status.StatusColumn(), status.WorkingCopyPathColumn(width=10)])
+        text = status.io.StringIO()
+        text_copy = status.io.StringIO()
+        json_lines = status.io.StringIO()
+        row_writer = status.TeeRowWriter([status.FileRowWriter(text), status.FileRowWriter(text_copy),
+                                          status.JsonRowWriter(json_lines)])
+        status.render(status.parse(self.lines, table.columns), table, row_writer)
+        self.assertIn('a/b.c', text.getvalue())
+        self.assertEqual(text.getvalue(), text_copy.getvalue())
+        items = [status.json.loads(line) for line in json_lines.getvalue().splitlines()]
+        self.assertEqual([{'Status': 'Modified', 'Working copy path': 'a/b.c'},
+                          {'description': '      >   local edit, incoming delete upon update'}], items)
+
+    def test_parse_output_spec(self):
+        self.assertEqual(('json', 'c:/out.jsonl'), status.parse_output_spec('json:c:/out.jsonl'))
+        with self.assertRaises(status.argparse.ArgumentTypeError):
+            status.parse_output_spec('xml:out.xml')
+
+
+class TestLineIndex(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+
+    def tearDown(self):
+        for path in [self.path, self.path + '.idx']:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def write(self, text, mode='w'):
+        with open(self.path, mode) as file:
+            file.write(text)
+
+    def test_read_lines_1(self):
+        self.write('l0\nl1\nl2\nl3\n')
+        index = status.LineIndex(self.path).update()
+        self.assertEqual(4, index.line_count)
+        self.assertEqual(['l1\n', 'l2\n'], list(index.read_lines(1, 3)))
+
+    def test_read_lines_2(self):
+        self.write('l0\nl1\nl2')
+        index = status.LineIndex(self.path).update()
+        self.assertEqual(3, index.line_count)
+        self.assertEqual(['l1\n', 'l2'], list(index.read_lines(1, None)))
+        self.assertEqual([], list(index.read_lines(5, 10)))
+
+    def test_incremental_update(self):
+        self.write('l0\nl1')
+        status.LineIndex(self.path).update()
+        self.write('x\nl2\n', mode='a')
+        index = status.LineIndex(self.path).update()
+        self.assertEqual(3, index.line_count)
+        self.assertEqual(['l1x\n', 'l2\n'], list(index.read_lines(1, 3)))
+
+    def test_rebuild_if_replaced(self):
+        self.write('l0\nl1\nl2\n')
+        status.LineIndex(self.path).update()
+        self.write('x\n')
+        index = status.LineIndex(self.path).update()
+        self.assertEqual(1, index.line_count)
+        self.assertEqual(['x\n'], list(index.read_lines(0, 3)))
+
+    def test_rebuild_if_tail_rewritten(self):
+        head = 'M            58416    48101 goncharov    a/b.c\n' * 200
+        self.write(head + 'x\n' * 20)
+        status.LineIndex(self.path).update()
+        self.write(head + 'yyy\n' * 30)
+        index = status.LineIndex(self.path).update()
+        self.assertEqual(230, index.line_count)
+        self.assertEqual(['yyy\n'], list(index.read_lines(210, 211)))
+
+    def test_unwritable_index(self):
+        self.write('l0\nl1\nl2\n')
+        index = status.LineIndex(self.path, os.path.join(self.path + '.missing', 'x.idx')).update()
+        self.assertEqual(['l1\n'], list(index.read_lines(1, 2)))
+
+    def test_parse_line_range(self):
+        self.assertEqual((2, 5), status.parse_line_range('2:5'))
+        self.assertEqual((0, 5), status.parse_line_range(':5'))
+        self.assertEqual((2, None), status.parse_line_range('2:'))
+        with self.assertRaises(status.argparse.ArgumentTypeError):
+            status.parse_line_range('5:2')
+
+
+class TestCompression(unittest.TestCase):
+    text = 'line1\nline2\n'
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def round_trip(self, name):
+        path = os.path.join(self.directory.name, name)
+        with status.open_output(path) as output:
+            output.write(self.text)
+        with status.open_input(path) as input_file:
+            return list(input_file)
+
+    def test_plain(self):
+        self.assertEqual(['line1\n', 'line2\n'], self.round_trip('dump.txt'))
+
+    def test_gz(self):
+        self.assertEqual(['line1\n', 'line2\n'], self.round_trip('dump.txt.gz'))
+
+    def test_bz2(self):
+        self.assertEqual(['line1\n', 'line2\n'], self.round_trip('dump.txt.bz2'))
+
+    def test_xz(self):
+        self.assertEqual(['line1\n', 'line2\n'], self.round_trip('dump.txt.xz'))
+
+    def test_detect_by_magic(self):
+        path = os.path.join(self.directory.name, 'dump.txt')
+        with status.gzip.open(path, 'wt') as output:
+            output.write(self.text)
+        with open(path, 'rb') as binary_file:
+            self.assertEqual('gz', status.detect_compression(binary_file))
+        with status.open_input(path) as input_file:
+            self.assertEqual(['line1\n', 'line2\n'], list(input_file))
+
+    def test_truncated(self):
+        path = os.path.join(self.directory.name, 'dump.txt.gz')
+        with status.open_output(path) as output:
+            output.write('M            58416    48101 goncharov    a/b.c\n' * 100)
+        with open(path, 'rb+') as file:
+            file.truncate(30)
+        output_path = os.path.join(self.directory.name, 'out.txt')
+        for options in [[], ['--rollup', '1']]:
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                exit_code = status.SVNStatusTransformApp([path, '-o', output_path] + options).run()
+            self.assertEqual(1, exit_code)
+            self.assertIn('Error while reading input', stdout.getvalue())
+
+
+class TestBatch(unittest.TestCase):
+    lines = [
+        'M       *    58416    48101 goncharov    a/b.c\n',
+        '?                                        svn.txt\n'
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.table = status.Table([status.StatusColumn(), status.WorkingCopyPathColumn()])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def create_input(self, name, lines):
+        path = os.path.join(self.directory.name, name)
+        with status.open_output(path) as output:
+            output.writelines(lines)
+        return path
+
+    def test_batch_output_path(self):
+        self.assertEqual(os.path.join('out', 'co.txt'), status.batch_output_path('in/co.status.gz', 'out'))
+        self.assertEqual(os.path.join('out', 'co.txt'), status.batch_output_path('co.status', 'out'))
+
+    def test_expand_inputs(self):
+        first = self.create_input('a.status', self.lines)
+        second = self.create_input('b.status', self.lines)
+        pattern = os.path.join(self.directory.name, '*.status')
+        self.assertEqual([first, second, 'missing'], status.expand_inputs([pattern, 'missing']))
+
+    def test_parse_positive_int(self):
+        self.assertEqual(4, status.parse_positive_int('4'))
+        for text in ['0', '-1', 'x']:
+            with self.assertRaises(status.argparse.ArgumentTypeError):
+                status.parse_positive_int(text)
+
+    def test_render_file_error(self):
+        path = self.create_input('bad.status', ['AML+SKC *  \n'])
+        result = status.render_file(path, os.path.join(self.directory.name, 'bad.txt'), self.table)
+        self.assertEqual(0, result.lines)
+        self.assertIn('AML+SKC *', result.error)
+
+    def test_render_file_encoding(self):
+        path = os.path.join(self.directory.name, 'legacy.status')
+        with open(path, 'wb') as file:
+            file.write('M            58416    48101 иванов    путь/файл.txt\n'.encode('cp1251'))
+        output_path = os.path.join(self.directory.name, 'legacy.txt')
+        result = status.render_file(path, output_path, self.table, encoding='cp1251')
+        self.assertIsNone(result.error)
+        with open(output_path) as output:
+            self.assertIn('путь/файл.txt', output.readlines()[2])
+
+    def test_render_batch_template(self):
+        paths = [self.create_input('a.status', self.lines)]
+        output_dir = os.path.join(self.directory.name, 'out')
+        template = status.RowTemplate('{status:1} {path}')
+        table = status.compile_table(selection=template.names)
+        results = status.render_batch(table, paths, output_dir, jobs=1, template=template)
+        self.assertIsNone(results[0].error)
+        with open(os.path.join(output_dir, 'a.txt')) as output:
+            self.assertEqual(['M a/b.c\n', 'N svn.txt\n'], output.readlines())
+
+    def test_render_batch(self):
+        paths = [self.create_input('a.status', self.lines), self.create_input('b.status.gz', self.lines),
+                 os.path.join(self.directory.name, 'missing.status')]
+        output_dir = os.path.join(self.directory.name, 'out')
+        results = status.render_batch(self.table, paths, output_dir, jobs=2)
+        self.assertEqual([2, 2, 0], [result.lines for result in results])
+        self.assertEqual([None, None], [result.error for result in results[:2]])
+        self.assertIsNotNone(results[2].error)
+        with open(os.path.join(output_dir, 'b.txt')) as output:
+            self.assertIn('a/b.c', output.readlines()[2])
+
+
+class TestSections(unittest.TestCase):
+    lines = [
+        'M       *    58416    48101 goncharov    a/b.c\n',
+        'X            58416    48101 goncharov    ext\n',
+        'Status against revision:  58420\n',
+        '\n',
+        "Performing status on external item at 'ext':\n",
+        'M            58416    48101 goncharov    ext/c.c\n',
+        'C       *    58416    48101 goncharov    ext/d.c\n',
+        'Status against revision:  58420\n',
+    ]
+
+    def setUp(self):
+        self.table = status.compile_table(selection=['status', 'path'])
+
+    def test_split_sections(self):
+        sections = list(status.split_sections(self.lines))
+        self.assertEqual([None, 'ext'], [section.external for section in sections])
+        self.assertEqual(['58420', '58420'], [section.revision for section in sections])
+        self.assertEqual([self.lines[:2], self.lines[5:7]], [section.lines for section in sections])
+        self.assertEqual([1, 6], [section.start for section in sections])
+
+    def test_split_sections_bytes(self):
+        sections = list(status.split_sections([line.encode() for line in self.lines]))
+        self.assertEqual("External item at 'ext' (status against revision 58420)", sections[1].title)
+        self.assertEqual(b'C       *    58416    48101 goncharov    ext/d.c\n', sections[1].lines[1])
+
+    def test_render_section(self):
+        section = list(status.split_sections(self.lines))[1]
+        result = status.render_section(section, self.table)
+        self.assertIsNone(result.error)
+        self.assertEqual(2, result.items)
+        self.assertEqual({'Modified': 1, 'Conflicts': 1}, result.statuses)
+        self.assertEqual(1, result.out_of_date)
+        self.assertIn('| ext/d.c ', result.text)
+
+    def test_render_section_changelists(self):
+        lines = ["--- Changelist 'fix':\n", self.lines[0], '\n', "--- Changelist 'docs':\n", self.lines[5]]
+        section = next(status.split_sections(lines))
+        for section_to_render in [section, next(status.split_sections([line.encode() for line in lines]))]:
+            result = status.render_section(section_to_render, self.table)
+            self.assertEqual(2, result.items)
+            self.assertEqual({'Modified': 2}, result.statuses)
+
+    def test_render_section_error(self):
+        lines = self.lines[:5] + ['M       *\n']
+        section = list(status.split_sections(lines))[1]
+        result = status.render_section(section, self.table, status.RowTemplate('{path}'))
+        self.assertIn('M       *', result.error)
+        self.assertEqual(6, section.start)
+
+    def test_render_sections(self):
+        lines = self.lines + [line.replace("'ext'", "'ext2'") for line in self.lines[3:]] * 2
+        results = list(status.render_sections(status.split_sections(lines), self.table, jobs=2))
+        self.assertEqual([None, 'ext', 'ext2', 'ext2'], [result.external for result in results])
+        self.assertEqual([2, 2, 2, 2], [result.items for result in results])
+
+
+class TestMerge(unittest.TestCase):
+    old = [
+        'M            10    10 u    a/b.c\n',
+        'C            10    10 u    a/c.c\n',
+        '      >   local edit, incoming delete upon update\n',
+        'M            10    10 u    b/c.c\n',
+    ]
+    new = [
+        'A            20    20 u    a\\c.c\n',
+        'M            20    20 u    ./a/d.c\n',
+        'M            20    20 u    c.c\n',
+    ]
+
+    def items(self, lines):
+        return status.group_items(status.parse(lines, [status.WorkingCopyPathColumn()]))
+
+    def test_path_key(self):
+        self.assertEqual(('a', 'b.c'), status.path_key('./a\\b.c'))
+        self.assertEqual((), status.path_key('.'))
+
+    def test_group_items(self):
+        items = list(self.items(self.old))
+        self.assertEqual([('a', 'b.c'), ('a', 'c.c'), ('b', 'c.c')], [key for key, _ in items])
+        self.assertEqual(self.old[1:3], items[1][1])
+
+    def test_is_sorted_by_path(self):
+        self.assertTrue(status.is_sorted_by_path(self.items(self.old)))
+        self.assertFalse(status.is_sorted_by_path(self.items(self.new[::-1])))
+
+    def test_merge_sorted(self):
+        merged = list(status.merge_sorted([self.items(self.old), self.items(self.new)]))
+        self.assertEqual([self.old[0], self.new[0], self.new[1], self.old[3], self.new[2]], merged)
+
+    def test_merge_sorted_out_of_order(self):
+        with self.assertRaises(status.ParseException) as context:
+            list(status.merge_sorted([self.items(self.old), self.items(self.new[::-1])]))
+        self.assertEqual(self.new[1], context.exception.line)
+
+    def test_merge_unsorted(self):
+        merged = list(status.merge_unsorted([self.items(self.old), self.items(self.new[::-1])]))
+        self.assertEqual([self.old[0], self.new[0], self.old[3], self.new[2], self.new[1]], merged)
+
+    def test_older_input_loses(self):
+        merged = list(status.merge_sorted([self.items(self.new), self.items(self.old)]))
+        self.assertEqual(self.old[1:3], merged[1:3])
+
+    def test_merge_split_changelists_rejected(self):
+        app = status.SVNStatusTransformApp(['old.txt', 'new.txt', '--merge', '--split-changelists', 'out'])
+        with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()) as stderr:
+            app.run()
+        self.assertIn('--split-changelists can not be used', stderr.getvalue())
+
+
+class TestChangelists(unittest.TestCase):
+    lines = [
+        'M            10    10 u    a.c\n',
+        '\n',
+        "--- Changelist 'release 1.2':\n",
+        'M            10    10 u    b.c\n',
+        '      >   local edit, incoming delete upon update\n',
+        '\n',
+        "--- Changelist 'docs':\n",
+        'A            10    10 u    d.txt\n',
+    ]
+
+    def test_parse(self):
+        records = list(status.parse(self.lines, [status.WorkingCopyPathColumn()]))
+        self.assertEqual([None, 'release 1.2', 'release 1.2', 'docs'], [record.changelist for record in records])
+        self.assertEqual(['a.c'], records[0].values)
+
+    def test_parse_bytes(self):
+        records = list(status.parse_bytes([line.encode() for line in self.lines], [status.WorkingCopyPathColumn()]))
+        self.assertEqual([None, 'release 1.2', 'release 1.2', 'docs'], [record.changelist for record in records])
+
+    def test_parse_error_line_number(self):
+        with self.assertRaises(status.ParseException) as context:
+            list(status.parse(self.lines + ['AML+SKC *  \n']))
+        self.assertEqual(9, context.exception.line_number)
+
+    def test_changelist_row_writer(self):
+        outputs = {}
+
+        def create_row_writer(changelist):
+            outputs[changelist] = status.io.StringIO()
+            return status.FileRowWriter(outputs[changelist])
+
+        table = status.compile_table(selection=['path'])
+        status.render(status.parse(self.lines, table.columns), table, status.ChangelistRowWriter(create_row_writer))
+        self.assertEqual([None, 'release 1.2', 'docs'], list(outputs))
+        lines = outputs['release 1.2'].getvalue().splitlines()
+        self.assertEqual(table.build_header(), lines[0])
+        self.assertIn('b.c', lines[2])
+        self.assertEqual(self.lines[4][:-1], lines[4])
+
+    def test_changelist_file_name(self):
+        used_names = set()
+        self.assertEqual('no-changelist.txt', status.changelist_file_name(None, used_names))
+        self.assertEqual('release_1.2.txt', status.changelist_file_name('release 1.2', used_names))
+        self.assertEqual('release_1.2-2.txt', status.changelist_file_name('release/1.2', used_names))
+
+
+class TestTableSpec(unittest.TestCase):
+    lines = [
+        'M       *    58416    48101 goncharov    a/b.c\n',
+        '?                                        very/long/path/to/some/file.txt\n',
+        '      >   local edit, incoming delete upon update\n',
+    ]
+
+    def setUp(self):
+        self.table = status.create_table([(11, 10)])
+        self.spec = self.table.compile()
+
+    def test_same_as_table(self):
+        self.assertEqual(self.table.build_header(), self.spec.build_header())
+        self.assertEqual(self.table.build_header_separator(), self.spec.build_header_separator())
+        self.assertEqual(self.table.table_width, self.spec.table_width)
+        for line in self.lines:
+            self.assertEqual(self.table.build_row(line), self.spec.build_row(line))
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            self.spec.table_width = 0
+        self.table.columns[11].width = 3
+        self.assertEqual(10, self.spec.widths[11])
+
+    def test_derive(self):
+        derived = self.spec.derive([(0, 3)], column_separator='|')
+        self.assertIs(self.spec.columns, derived.columns)
+        self.assertEqual(3, derived.widths[0])
+        self.assertEqual(6, self.spec.widths[0])
+        self.assertTrue(derived.build_header().startswith('| Sta|Props|'))
+
+    def test_pickle(self):
+        self.assertEqual(self.spec.build_header(), pickle.loads(pickle.dumps(self.spec)).build_header())
+
+    def test_concurrent_render(self):
+        expected = [self.table.build_row(line) for line in self.lines] * 200
+        results = []
+
+        def work():
+            results.append([self.spec.format_record(record)
+                            for record in status.parse(self.lines * 200, self.spec.columns)])
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([expected] * 8, results)
+
+
+class TestAsyncRowWriter(unittest.TestCase):
+
+    class ListRowWriter(status.RowWriter):
+        def __init__(self, fail_on=None):
+            self.rows = []
+            self.closed = False
+            self.fail_on = fail_on
+
+        def write(self, row):
+            if row == self.fail_on:
+                raise OSError('disk full')
+            self.rows.append(row)
+
+        def close(self):
+            self.closed = True
+
+    def test_write(self):
+        target = self.ListRowWriter()
+        row_writer = status.AsyncRowWriter(target, batch_size=3, queue_size=1)
+        table = status.compile_table(selection=['path'])
+        count = status.render(status.parse(['?       a{}\n'.format(i) for i in range(100)], table.columns),
+                              table, row_writer)
+        row_writer.close()
+        self.assertEqual(100, count)
+        self.assertTrue(target.closed)
+        self.assertEqual(202, len(target.rows))
+        self.assertEqual(table.format_row(['a99']), target.rows[-2])
+
+    def test_flush(self):
+        target = self.ListRowWriter()
+        row_writer = status.AsyncRowWriter(target)
+        row_writer.write('a')
+        row_writer.flush()
+        self.assertEqual(['a'], target.rows)
+        row_writer.close()
+
+    def test_error(self):
+        target = self.ListRowWriter(fail_on='3')
+        row_writer = status.AsyncRowWriter(target, batch_size=2, queue_size=1)
+        with self.assertRaises(OSError):
+            for i in range(1000):
+                row_writer.write(str(i))
+        row_writer.close()
+        self.assertEqual(['0', '1', '2'], target.rows)
+        self.assertTrue(target.closed)
+
+    def test_error_on_close(self):
+        target = self.ListRowWriter(fail_on='x')
+        row_writer = status.AsyncRowWriter(target)
+        row_writer.write('x')
+        with self.assertRaises(OSError):
+            row_writer.close()
+        self.assertTrue(target.closed)
+
+    def test_error_pending_on_close(self):
+        target = self.ListRowWriter(fail_on='0')
+        row_writer = status.AsyncRowWriter(target, batch_size=2)
+        row_writer.write('0')
+        row_writer.write('1')
+        for _ in range(1000):  # wait until the first batch fails in the background thread
+            if row_writer._AsyncRowWriter__error is not None:
+                break
+            time.sleep(0.01)
+        row_writer.write('2')
+        with self.assertRaises(OSError):
+            row_writer.close()
+        self.assertFalse(row_writer._AsyncRowWriter__thread.is_alive())
+        self.assertTrue(target.closed)
+
+
+class TestHooks(unittest.TestCase):
+    lines = [
+        'M L     *    58416    48101 goncharov    release/b.c\n',
+        '      >   local edit, incoming delete upon update\n',
+        '?                                        a/svn.txt\n',
+        'M            58416    48101 goncharov    a/c.c\n',
+    ]
+
+    class NoLockedInRelease(status.RecordHook):
+        columns = ('locked', 'path')
+        annotates = True
+
+        def process(self, records, index):
+            for record in records:
+                if record.values is not None and record.values[index['path']].startswith('release/') \
+                        and record.values[index['locked']] == 'Locked':
+                    record.note = 'locked under release'
+                    self.counts['violations'] += 1
+
+    class DropUnversioned(status.RecordHook):
+        columns = ('status',)
+
+        def process(self, records, index):
+            return [record for record in records
+                    if record.values is None or record.values[index['status']] != 'Not controlled']
+
+    def test_hook_columns(self):
+        columns = status.hook_columns([status.WorkingCopyPathColumn()], [self.NoLockedInRelease()])
+        self.assertEqual(['path', 'locked'], [col.name for col in columns])
+
+    def test_pipeline(self):
+        hooks = [self.NoLockedInRelease(), self.DropUnversioned()]
+        columns = status.hook_columns([status.WorkingCopyPathColumn()], hooks)
+        pipeline = status.HookPipeline(hooks, columns, batch_size=3)
+        records = list(pipeline.apply(status.parse(self.lines, columns), keep=1))
+        self.assertEqual([['release/b.c', 'locked under release'], None, ['a/c.c', '']],
+                         [record.values for record in records])
+        rows = pipeline.rows()
+        self.assertEqual(['NoLockedInRelease', '2', '4', '4'], rows[0][:4])
+        self.assertEqual('violations 1', rows[0][5])
+        self.assertEqual(['DropUnversioned', '2', '4', '3'], rows[1][:4])
+
+    def test_template_keeps_notes(self):
+        hooks = [self.NoLockedInRelease()]
+        template = status.RowTemplate('{path}')
+        columns = status.hook_columns(template.columns, hooks)
+        records = status.HookPipeline(hooks, columns).apply(status.parse(self.lines[:1], columns), keep=1)
+        output = io.StringIO()
+        status.render(records, status.compile_table(selection=['path']),
+                      status.TemplateRowWriter(template, status.FileRowWriter(output)))
+        self.assertEqual('release/b.c  locked under release\n', output.getvalue())
+
+    def test_hook_rejected_in_reports(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'checks.py')
+            with open(path, 'w') as file:
+                file.write('import status\n\n\nclass Check(status.RecordHook):\n    columns = ("path",)\n')
+            for options in [['--rollup', '1'], ['--revision-stats'], ['--update-plan'], ['--externals'],
+                            ['--query', 'db', 'SELECT 1'], ['--serve', 'socket']]:
+                app = status.SVNStatusTransformApp(['--hook', path + ':Check', 'input.txt'] + options)
+                with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+                    app.run()
+
+    def test_load_hook(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'checks.py')
+            with open(path, 'w') as file:
+                file.write('import status\n\n\nclass Check(status.RecordHook):\n    columns = ("path",)\n\n\n'
+                           'class Unknown(status.RecordHook):\n    columns = ("size",)\n')
+            self.assertEqual('Check', status.load_hook(path + ':Check').name)
+            with self.assertRaises(ValueError):
+                status.load_hook(path + ':Unknown')
+            with self.assertRaises(ValueError):
+                status.load_hook('status:Table')
+            with self.assertRaises(AttributeError):
+                status.load_hook(path + ':Missing')
+
+
+class TestRowTemplate(unittest.TestCase):
+    line = 'M       *    58416    48101 goncharov    a/b.c\n'
+
+    def test_format_record(self):
+        template = status.RowTemplate('{status:1}{out_of_date:1} {working_revision:>6} {path} ({status})')
+        self.assertEqual(['status', 'out_of_date', 'working_revision', 'path'], template.names)
+        record = status.parse_line(self.line, template.columns)
+        self.assertEqual('MO  58416 a/b.c (Modified)', template.format_record(record))
+
+    def test_literal_braces(self):
+        template = status.RowTemplate('{{{path}}}')
+        self.assertEqual('{a/b.c}', template.format_record(status.parse_line(self.line, template.columns)))
+
+    def test_conflict_description(self):
+        template = status.RowTemplate('{path}')
+        line = '      >   local edit, incoming delete upon update\n'
+        self.assertEqual(line[:-1], template.format_record(status.parse_line(line, template.columns)))
+
+    def test_invalid(self):
+        for text in ['{unknown}', '{path', '{path!r}', '{path:q}', '{0}']:
+            with self.assertRaises(ValueError):
+                status.RowTemplate(text)
+
+    def test_template_row_writer(self):
+        output = io.StringIO()
+        template = status.RowTemplate('{status:1} {path}')
+        table = status.compile_table(selection=template.names)
+        status.render(status.parse([self.line], table.columns), table,
+                      status.TemplateRowWriter(template, status.FileRowWriter(output)))
+        self.assertEqual('M a/b.c\n', output.getvalue())
+
+
+class TestSample(unittest.TestCase):
+    lines = ['M                 10       10 user         a/{}.c\n'.format(i) for i in range(1000)] + [
+        'C                 10       10 user         b.c\n',
+        '      >   local edit, incoming delete upon update\n',
+    ]
+
+    def test_reservoir(self):
+        reservoir = status.Reservoir(10, random.Random(1))
+        for i in range(5):
+            reservoir.add(i)
+        self.assertEqual([0, 1, 2, 3, 4], reservoir.items)
+        for i in range(5, 10000):
+            reservoir.add(i)
+        self.assertEqual(10, len(set(reservoir.items)))
+        self.assertEqual(10000, reservoir.count)
+
+    def test_reservoir_is_uniform(self):
+        rng = random.Random(2)
+        hits = [0] * 20
+        for _ in range(2000):
+            reservoir = status.Reservoir(2, rng)
+            for i in range(20):
+                reservoir.add(i)
+            for i in reservoir.items:
+                hits[i] += 1
+        self.assertTrue(all(150 < count < 250 for count in hits), hits)
+
+    def test_sample_size_argument(self):
+        for size in ['0', '-1']:
+            with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+                status.SVNStatusTransformApp(['--sample', size, 'input.txt'])
+
+    def test_sample_lines(self):
+        sample, counts = status.sample_lines(self.lines, 5, rng=random.Random(3))
+        self.assertEqual(5, len(sample))
+        self.assertEqual(sorted(sample, key=self.lines.index), sample)
+        self.assertEqual({'M': 1000, 'C': 1}, {flag: total for flag, (total, _) in counts.items()})
+        self.assertEqual(5, sum(sampled for _, sampled in counts.values()))
+
+    def test_sample_lines_stratified(self):
+        sample, counts = status.sample_lines([line.encode() for line in self.lines], 3, stratified=True,
+                                             rng=random.Random(4))
+        self.assertEqual(4, len(sample))
+        self.assertIn(b'C                 10       10 user         b.c\n', sample)
+        self.assertEqual({'M': [1000, 3], 'C': [1, 1]}, counts)
+
+
+class TestProgressReporter(unittest.TestCase):
+
+    def test_wrap(self):
+        stream = io.StringIO()
+        progress = status.ProgressReporter(total_bytes=20, stream=stream, interval=0, check_every=2)
+        self.assertEqual(['1234\n'] * 4, list(progress.wrap(['1234\n'] * 4)))
+        reports = stream.getvalue().splitlines()
+        self.assertEqual(3, len(reports))
+        self.assertTrue(reports[0].startswith('0.0 MB, 2 lines, '))
+        self.assertIn(', 4 lines, ', reports[-1])
+        self.assertIn('100% ETA 0:00:00', reports[-1])
+
+    def test_wrap_counts_bytes_of_text(self):
+        data = 'путь\n'.encode('utf-8') * 4
+        stream = io.StringIO()
+        progress = status.ProgressReporter(total_bytes=len(data), stream=stream, check_every=2)
+        text_file = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8')
+        self.assertEqual(4, len(list(progress.wrap(text_file, text_file.buffer))))
+        self.assertEqual(len(data), progress.bytes)
+        self.assertIn('100%', stream.getvalue())
+
+    def test_wrap_closed(self):
+        stream = io.StringIO()
+        progress = status.ProgressReporter(stream=stream, interval=3600, check_every=2)
+        lines = progress.wrap(['1234\n'] * 4)
+        self.assertEqual(['1234\n'] * 3, [next(lines) for _ in range(3)])
+        lines.close()
+        self.assertIn('0.0 MB, 3 lines, ', stream.getvalue())
+
+    def test_final_report_with_limit(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'input.txt')
+            with open(path, 'w') as file:
+                file.writelines('M            10    10 u    {}.c\n'.format(i) for i in range(10))
+            app = status.SVNStatusTransformApp([path, '--progress', '--limit', '2'])
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()) as stderr:
+                self.assertEqual(0, app.run())
+        self.assertIn(' MB, ', stderr.getvalue())
+
+    def test_no_report_before_interval(self):
+        stream = io.StringIO()
+        progress = status.ProgressReporter(stream=stream, interval=3600, check_every=1)
+        progress.add(10, 100)
+        self.assertEqual('', stream.getvalue())
+        progress.finish()
+        self.assertNotIn('ETA', stream.getvalue())
+
+
+class TestSnapshotStore(unittest.TestCase):
+    lines = [
+        'M       *    58416    48101 goncharov    a/b.c\n',
+        'C            58416    48101 goncharov    a/d.c\n',
+        '      >   local edit, incoming delete upon update\n',
+    ]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = status.SnapshotStore(os.path.join(self.directory.name, 'snapshots.db'))
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def ingest(self, snapshot, lines):
+        return self.store.ingest(status.parse(lines, status.create_columns()), snapshot, '2020-01-01T00:00:00')
+
+    def test_ingest(self):
+        self.assertEqual(2, self.ingest('first', self.lines))
+        names, rows = self.store.query('SELECT snapshot, path, status FROM history ORDER BY path')
+        self.assertEqual(['snapshot', 'path', 'status'], names)
+        self.assertEqual([('first', 'a/b.c', 'Modified'), ('first', 'a/d.c', 'Conflicts')], list(rows))
+
+    def test_ingest_replaces_snapshot(self):
+        self.ingest('first', self.lines)
+        self.ingest('first', self.lines[:1])
+        self.ingest('second', self.lines)
+        names, rows = self.store.query('SELECT snapshot, COUNT(*) FROM history GROUP BY snapshot ORDER BY snapshot')
+        self.assertEqual([('first', 1), ('second', 2)], list(rows))
+
+    def test_ingest_undecodable_path(self):
+        lines = [b'M       *    58416    48101 goncharov    a/\xff.c\n',
+                 b'M            58416    48101 ivanov    a/b.c\n']
+        self.assertEqual(2, self.store.ingest(status.parse_bytes(lines), 'first', encoding='utf-8'))
+        names, rows = self.store.query('SELECT path, author FROM entries ORDER BY author')
+        self.assertEqual([(b'a/\xff.c', 'goncharov'), ('a/b.c', 'ivanov')], list(rows))
+
+    def test_ingest_rows(self):
+        lines = [line.encode() for line in self.lines]
+        self.assertEqual(2, self.store.ingest_rows(status.parse_bytes_rows(lines), 'first'))
+        names, rows = self.store.query('SELECT path, status, out_of_date FROM history ORDER BY path')
+        self.assertEqual([('a/b.c', 'Modified', 'Out of date'), ('a/d.c', 'Conflicts', ' ')], list(rows))
+
+    def test_indexes_created_after_load(self):
+        query = "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'entries' ORDER BY name"
+        self.assertEqual([], list(self.store.query(query)[1]))
+        self.ingest('first', self.lines)
+        self.assertEqual([('entries_path',), ('entries_snapshot',), ('entries_status',)],
+                         list(self.store.query(query)[1]))
+
+    def test_create_query_table(self):
+        table = status.create_query_table(['path', 'count'])
+        self.assertIsInstance(table.columns[0], status.WorkingCopyPathColumn)
+        self.assertEqual('count', table.columns[1].title)
+
 
 if __name__ == '__main__':
     unittest.main()